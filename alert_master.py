@@ -0,0 +1,113 @@
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+from logging_setup import log_throttled
+
+class AlertMaster:
+    """
+    Keeps the Alert Master role equal to "holds every required role".
+
+    Every check compares the desired state with the member's actual roles
+    and only calls Discord when they differ, so running it again (on a member
+    update, a join, a reconcile pass) is harmless. Changes the bot makes are
+    remembered until their member update arrives: that echo is recognised
+    and not treated as a new role change, and an update that arrives while
+    our change is still in flight does not issue the same change again.
+    """
+
+    def __init__(self, role_id: int, required_role_ids: Iterable[int], expire: float = 30,
+                 clock: Callable[[], float] = time.monotonic):
+        self.role_id = role_id
+        self.required = set(required_role_ids)
+        self.configured = None not in self.required
+        if not self.configured:
+            logging.error("One or more role IDs for alert role check are missing from EMOJI_ROLE_MAP.")
+        self.expire = expire  # Forget a change whose echo never arrived after this many seconds
+        self.clock = clock
+        self.in_flight: Dict[int, Tuple[bool, float]] = {}  # member ID -> (alert role expected, issued at)
+        self.metrics = {
+            "added": 0,
+            "removed": 0,
+            "echoes": 0,
+            "in_flight_skips": 0,
+            "unchanged": 0
+        }
+
+    def desired(self, role_ids: Set[int]) -> bool:
+        return self.required <= role_ids
+
+    def settle(self, role_ids: Set[int]) -> Set[int]:
+        """Add or drop the alert role in a role set that is about to be written."""
+        if not self.configured:
+            return role_ids
+        if self.desired(role_ids):
+            role_ids.add(self.role_id)
+        else:
+            role_ids.discard(self.role_id)
+        return role_ids
+
+    def expect(self, member_id: int, role_ids: Set[int]):
+        """Remember a role change the bot issued, so its member update is recognised as an echo."""
+        self.in_flight[member_id] = (self.role_id in role_ids, self.clock())
+
+    def needs_change(self, member_id: int, role_ids: Set[int]) -> Optional[bool]:
+        """
+        The alert role state to apply for a member with these roles, or None
+        when nothing needs doing (already right, or our change is on its way).
+        """
+        if not self.configured:
+            return None
+        has = self.role_id in role_ids
+        expected = self.in_flight.get(member_id)
+        if expected is not None:
+            state, issued_at = expected
+            if state == has:
+                # The echo of our own change
+                del self.in_flight[member_id]
+                self.metrics["echoes"] += 1
+            elif self.clock() - issued_at < self.expire:
+                # An update from before our change landed
+                self.metrics["in_flight_skips"] += 1
+                return None
+            else:
+                del self.in_flight[member_id]
+
+        should_have = self.desired(role_ids)
+        if should_have == has:
+            self.metrics["unchanged"] += 1
+            return None
+        return should_have
+
+    async def sync(self, member) -> bool:
+        """Bring one member's alert role in line with their other roles. Returns True if it changed."""
+        if member.bot:
+            return False
+        role_ids = {role.id for role in member.roles}
+        should_have = self.needs_change(member.id, role_ids)
+        if should_have is None:
+            return False
+
+        alert_role = member.guild.get_role(self.role_id)
+        if alert_role is None:
+            log_throttled("alert-role-missing", f"Alert role {self.role_id} not found in the server", level=logging.ERROR)
+            return False
+        self.expect(member.id, self.settle(role_ids))
+        try:
+            if should_have:
+                await member.add_roles(alert_role, reason="Alert Master")
+                self.metrics["added"] += 1
+                logging.info(f"Added alert role to {member.display_name}")
+            else:
+                await member.remove_roles(alert_role, reason="Alert Master")
+                self.metrics["removed"] += 1
+                logging.info(f"Removed alert role from {member.display_name}")
+        except Exception:
+            self.in_flight.pop(member.id, None)
+            raise
+        return True
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return a copy of the counters plus the number of changes waiting for their echo."""
+        metrics = dict(self.metrics)
+        metrics["in_flight"] = len(self.in_flight)
+        return metrics
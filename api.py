@@ -2,16 +2,10 @@ import logging
 import json
 import aiohttp
 import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
-import requests
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s',
-    datefmt='%H:%M:%S'
-)
+from timing import timings
 
 class APIFallback:
     def __init__(self):
@@ -31,6 +25,7 @@ class APIFallback:
         """
         try:
             self.logger.info("Fetching data from fallback API endpoints...")
+            fetch_started = time.perf_counter()
             async with aiohttp.ClientSession() as session:
                 # Fetch gear and seeds
                 try:
@@ -70,6 +65,7 @@ class APIFallback:
                 })
 
                 self.logger.info(f"Fallback API returned: {sum(len(v) for v in transformed_data.values())} total items")
+                timings.observe("api.fetch", time.perf_counter() - fetch_started)
                 return transformed_data
 
         except Exception as e:
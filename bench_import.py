@@ -0,0 +1,79 @@
+"""
+Import-time budget for the bot process.
+
+Imports gagbot in fresh interpreters (with a stub config, nothing connects),
+reports the median import time and the slowest modules, and exits with an
+error if the median is over budget or if a module that should only load on
+demand was imported.
+
+    python bench_import.py --budget 0.75 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must not be loaded just by importing the bot
+LAZY_MODULES = ["playwright", "bs4", "requests", "aiohttp.web"]
+
+CHILD = """
+import json, sys, time
+import simulate
+simulate.install_stub_config()
+started = time.perf_counter()
+import gagbot
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+def run_once(importtime: bool = False):
+    """Import the bot in a fresh interpreter. Returns (result, stderr)."""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", CHILD % LAZY_MODULES]
+    here = os.path.dirname(os.path.abspath(__file__))
+    completed = subprocess.run(command, cwd=here, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+def slowest_modules(importtime_output: str, top: int = 10):
+    """Top-level-ish modules with the largest cumulative import time, from -X importtime output."""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.rstrip()))
+    return sorted(modules, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the bot's import time against a budget")
+    parser.add_argument("--budget", type=float, default=0.75, help="Maximum median import time in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to measure")
+    args = parser.parse_args()
+
+    results = [run_once()[0] for _ in range(args.runs)]
+    median = statistics.median(result["seconds"] for result in results)
+    _, importtime_output = run_once(importtime=True)
+
+    print(f"Median import time over {args.runs} runs: {median * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    print("Slowest imports (cumulative):")
+    for microseconds, name in slowest_modules(importtime_output):
+        print(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = sorted({module for result in results for module in result["loaded"]})
+    if loaded:
+        print(f"FAIL: imported at startup but should load on demand: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget:
+        print("FAIL: import time is over budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
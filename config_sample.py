@@ -24,4 +24,29 @@ EMOJI_ROLE_MAP = {
     "🌽": 1234567890123456789,  # Harvest Event Ping
 }
 
-ALERT_ROLE_ID = 1234567890123456789 # Master Alert Role you get when you have the main alerts on
\ No newline at end of file
+ALERT_ROLE_ID = 1234567890123456789 # Master Alert Role you get when you have the main alerts on
+
+# Optional features (safe to leave out)
+DIGEST_MODE = False # Post each stock cycle (embed + all alerts) as a single message
+LOG_FLUSH_INTERVAL = 10 # Seconds between batched messages to the logs channel
+LOG_FLUSH_MAX_ENTRIES = 20 # Flush the logs channel batch early once this many distinct lines are waiting
+LIVE_BOARD_MODE = False # Keep one live stock message per channel and edit it when stock changes (pings stay separate)
+WEBHOOK_DELIVERY = False # Post stock updates and alerts through channel webhooks (needs Manage Webhooks)
+FANOUT_CONCURRENCY = 5 # How many servers receive a stock update at the same time
+FANOUT_TIMEOUT = 30 # Seconds before giving up on delivering to one server
+WEATHER_POLL_INTERVAL = 20 # Seconds between lightweight weather checks (reads only the weather section)
+STATE_SAVE_DEBOUNCE = 2 # Seconds to gather state changes into a single write of bot_cache.json
+LOG_LEVEL = "INFO" # Console log level
+LOG_LEVELS = {} # Per-module console levels, e.g. {"scraper": "WARNING", "discord": "INFO"}
+METRICS_PORT = None # Serve Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics, e.g. 9108
+METRICS_HOST = "127.0.0.1" # Keep the metrics endpoint local unless your scraper runs elsewhere
+BROWSER_SCRAPING = True # False reads the stock page over plain HTTP and never loads Playwright
+MEMBER_CACHE = "full" # "lazy" skips member chunking at startup and caches no members; alert roles are tracked in a compact role index
+ROLE_RECONCILE_CONCURRENCY = 3 # Alert role changes in flight at once when fixing roles in bulk
+ROLE_RECONCILE_RATE = 2 # Alert role changes per second during a bulk fix (slows down by itself on rate limits)
+REACTION_ROLE_DEBOUNCE = 1.5 # Seconds to gather a user's role reactions into a single role update
+ROLE_PICKER = True # Add a role picker to the role message so members can pick all their alert roles at once
+WELCOME_BURST_THRESHOLD = 10 # Joins within a minute that switch welcome messages to batches
+WELCOME_BATCH_INTERVAL = 30 # Seconds between batched welcome messages during a join burst
+WELCOME_BATCH_SIZE = 50 # Members greeted by name in one batched welcome (the rest are counted)
+INVITE_RECOUNT_WINDOW = 10 # Seconds of member joins combined into one invite challenge recount
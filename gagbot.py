@@ -1,17 +1,36 @@
 import discord
 import asyncio
-import requests
 import logging
 from datetime import datetime
 import time
 import json
+import hashlib
+import aiohttp
 from discord import app_commands
+import config
 from config import TOKEN, STOCK_CHANNEL_ID, ROLE_CHANNEL_ID, EMOJI_ROLE_MAP, ALERT_ROLE_ID, LOGS_CHANNEL_ID, NEWS_CHANNEL_ID, TEST_CHANNEL_ID, UPDATES_CHANNEL_ID, HARVEST_CHANNEL_ID, WEATHER_CHANNEL_ID, WELCOME_CHANNEL_ID, ABOUT_CHANNEL_ID
 import pytz
-from scraper import fetch_stock_data
+from scraper import fetch_stock_data, fetch_stock_data_http, parse_stock_page
 from calculator import calculator  # Add this import
 from api import api_fallback  # Add this import
 from invite import invite_challenge  # Add invite challenge import
+from log_shipper import LogShipper
+from webhooks import WebhookDelivery
+from guild_config import guild_configs
+from scheduler import Scheduler, SKIP, COALESCE
+from supervisor import TaskSupervisor
+from weather import weather_probe
+from state_store import StateStore
+from logging_setup import setup_logging, log_throttled
+from timing import timings
+from profiling import profiler
+from metrics import metrics, timing_families, process_rss_bytes, RateLimitCounter, LoopLagMonitor, MetricsServer
+from role_index import RoleIndex, watch_member_updates
+from role_reconciler import RoleReconciler, ADD
+from reaction_roles import ReactionRoles
+from alert_master import AlertMaster
+from role_picker import RolePickerView
+from welcome import WelcomeBatcher
 import os
 
 # Configure all required intents
@@ -26,61 +45,194 @@ PHOENIX_TZ = pytz.timezone('America/Phoenix')
 # Cache file path
 CACHE_FILE = 'bot_cache.json'
 
-def load_cache():
+# Optional settings - older config.py files may not define these
+DIGEST_MODE = getattr(config, "DIGEST_MODE", False)  # Post each stock cycle as a single message
+LIVE_BOARD_MODE = getattr(config, "LIVE_BOARD_MODE", False)  # Edit one persistent stock message instead of posting new ones
+WEBHOOK_DELIVERY = getattr(config, "WEBHOOK_DELIVERY", False)  # Post stock updates and alerts through channel webhooks
+FANOUT_CONCURRENCY = getattr(config, "FANOUT_CONCURRENCY", 5)  # Servers receiving a stock update at the same time
+FANOUT_TIMEOUT = getattr(config, "FANOUT_TIMEOUT", 30)  # Seconds before giving up on one server's delivery
+LOG_FLUSH_INTERVAL = getattr(config, "LOG_FLUSH_INTERVAL", 10)  # Seconds between logs channel batches
+LOG_FLUSH_MAX_ENTRIES = getattr(config, "LOG_FLUSH_MAX_ENTRIES", 20)  # Flush early once this many lines wait
+WEATHER_POLL_INTERVAL = getattr(config, "WEATHER_POLL_INTERVAL", 20)  # Seconds between weather probes
+STATE_SAVE_DEBOUNCE = getattr(config, "STATE_SAVE_DEBOUNCE", 2)  # Seconds to gather state changes into one cache write
+LOG_LEVEL = getattr(config, "LOG_LEVEL", "INFO")
+LOG_LEVELS = getattr(config, "LOG_LEVELS", {})  # Per-module levels, e.g. {"scraper": "WARNING"}
+METRICS_PORT = getattr(config, "METRICS_PORT", None)  # Serve Prometheus metrics on this port (off when None)
+METRICS_HOST = getattr(config, "METRICS_HOST", "127.0.0.1")
+BROWSER_SCRAPING = getattr(config, "BROWSER_SCRAPING", True)  # False reads the stock page over plain HTTP and never loads Playwright
+MEMBER_CACHE = getattr(config, "MEMBER_CACHE", "full")  # "lazy" skips member chunking at startup and keeps members out of the cache
+ROLE_RECONCILE_CONCURRENCY = getattr(config, "ROLE_RECONCILE_CONCURRENCY", 3)  # Alert role changes in flight at once
+ROLE_RECONCILE_RATE = getattr(config, "ROLE_RECONCILE_RATE", 2)  # Alert role changes per second (halved on 429s)
+REACTION_ROLE_DEBOUNCE = getattr(config, "REACTION_ROLE_DEBOUNCE", 1.5)  # Seconds to gather one user's reactions into one role update
+ROLE_PICKER = getattr(config, "ROLE_PICKER", True)  # Add a select menu for the alert roles to the role message
+WELCOME_BURST_THRESHOLD = getattr(config, "WELCOME_BURST_THRESHOLD", 10)  # Joins per minute that switch to batched welcomes
+WELCOME_BATCH_INTERVAL = getattr(config, "WELCOME_BATCH_INTERVAL", 30)  # Seconds between batched welcome messages
+WELCOME_BATCH_SIZE = getattr(config, "WELCOME_BATCH_SIZE", 50)  # Members greeted by name in one batched welcome
+INVITE_RECOUNT_WINDOW = getattr(config, "INVITE_RECOUNT_WINDOW", 10)  # Seconds of joins combined into one invite recount
+
+# Members holding all three of these roles get the Alert Master role
+ALERT_MASTER_EMOJIS = ("🔥", "🥚", "🧰")
+
+# Names of the alert roles in the role picker menu
+ROLE_LABELS = {
+    "🦄": "Mythical Seeds Alerts",
+    "🌟": "Legendary Seeds Alerts",
+    "🔥": "Rare Seeds Alerts",
+    "🧰": "Gear Alerts",
+    "🥚": "Egg Alerts",
+    "🌧️": "Weather Alerts",
+    "🌽": "Harvest Ping"
+}
+
+# Discord allows at most 10 embeds per message
+MAX_EMBEDS_PER_MESSAGE = 10
+
+def member_cache_options(policy):
+    """
+    Client options for a member cache policy. "full" chunks every server at
+    startup and keeps all members cached (discord.py's default). "lazy" skips
+    the startup chunking and caches no members besides the bot itself; role
+    checks go through the role index and members are fetched when needed.
+    """
+    if policy == "lazy":
+        return {"chunk_guilds_at_startup": False, "member_cache_flags": discord.MemberCacheFlags.none()}
+    if policy != "full":
+        logging.warning(f"Unknown MEMBER_CACHE {policy!r}, using 'full'")
+    return {"chunk_guilds_at_startup": True, "member_cache_flags": discord.MemberCacheFlags.from_intents(intents)}
+
+def load_cache(store):
     """Load cached data from file."""
-    try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        logging.error(f"Error loading cache: {e}")
+    cache = store.load()
+    if cache is not None:
+        return cache
     return {
         "last_data": None,
         "repeated_data_count": 0,
         "is_website_broken": False,
         "last_weather_alert": None,
-        "fallback_switch_time": None
+        "fallback_switch_time": None,
+        "live_boards": {},
+        "webhooks": {},
+        "command_tree_hash": None,
+        "role_message_id": None
     }
 
-def save_cache(data):
-    """Save data to cache file."""
-    try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(data, f)
-    except Exception as e:
-        logging.error(f"Error saving cache: {e}")
-
 class MyClient(discord.Client):
     def __init__(self):
-        super().__init__(intents=intents)
+        super().__init__(intents=intents, **member_cache_options(MEMBER_CACHE))
         self.tree = app_commands.CommandTree(self)
+
+        # Holders of the alert roles by member ID, kept current from member events
+        self.role_index = RoleIndex(set(EMOJI_ROLE_MAP.values()) | {ALERT_ROLE_ID})
+        watch_member_updates(self, self.on_raw_member_update)
         
         # Load cached data
-        cache = load_cache()
+        self.state_store = StateStore(CACHE_FILE, self.state_snapshot, debounce=STATE_SAVE_DEBOUNCE)
+        cache = load_cache(self.state_store)
         self.last_data = cache.get("last_data")
         self.repeated_data_count = cache.get("repeated_data_count", 0)
         self.is_website_broken = cache.get("is_website_broken", False)
         self.last_weather_alert = cache.get("last_weather_alert")
         self.fallback_switch_time = cache.get("fallback_switch_time")
+        self.live_boards = cache.get("live_boards") or {}  # channel ID -> {"message_id", "hash", "webhook"}
+        self.verified_boards = set()  # Channels whose board message was seen since the start
+        self.webhooks = cache.get("webhooks") or {}  # channel ID -> {"id"}; tokens are never written to disk
+        self.command_tree_hash = cache.get("command_tree_hash")  # Hash of the slash commands as last synced
+        self.role_message_id = cache.get("role_message_id")  # The role-selection message in the role channel
+        self.webhook_delivery = WebhookDelivery(self.webhooks, on_change=self.save_state_now) if WEBHOOK_DELIVERY else None
         self.logs_channel_id = LOGS_CHANNEL_ID
         self.just_switched_to_fallback = False  # Track if we just switched to fallback
         self.just_restored_main_api = False  # Track if we just restored main API
+        self.last_health_check = None  # When the fallback monitor last checked the main website
+        self.last_weather_scrape = 0  # When the weather job last fell back to a full scrape
+        self.scheduler = Scheduler(on_error=lambda message: self.send_log(message, "ERROR"))
+        self.add_jobs()
+        self.log_shipper = LogShipper(
+            self.ship_logs,
+            flush_interval=LOG_FLUSH_INTERVAL,
+            max_entries=LOG_FLUSH_MAX_ENTRIES
+        )
+        self.ready_once = False  # on_ready fires again after reconnects
+
+        # Every long-running task is owned by the supervisor so it only ever runs once
+        self.supervisor = TaskSupervisor(on_error=lambda message: self.send_log(message, "ERROR"))
+        self.supervisor.register("scheduler", self.scheduler.run)
+        self.supervisor.register("log_shipper", self.log_shipper.run)
+        self.supervisor.register("state_store", self.state_store.run)
+
+        # Bulk alert role fixes run in the background and resume after a restart
+        self.role_reconciler = RoleReconciler(
+            apply_alert_role_change,
+            concurrency=ROLE_RECONCILE_CONCURRENCY,
+            rate=ROLE_RECONCILE_RATE,
+            rate_limited=lambda: metrics.value("gagbot_discord_rate_limited_total", scope="bot")
+        )
+        self.supervisor.register("role_reconcile", self.role_reconciler.run)
+        self.alert_master = AlertMaster(ALERT_ROLE_ID, [EMOJI_ROLE_MAP.get(emoji) for emoji in ALERT_MASTER_EMOJIS])
+        self.reaction_roles = ReactionRoles(EMOJI_ROLE_MAP, self.alert_master, debounce=REACTION_ROLE_DEBOUNCE)
+        self.role_picker = None  # Built in setup_hook (views need the running event loop)
+
+        # Welcome messages switch to batches during join bursts
+        self.welcomes = WelcomeBatcher(
+            send_welcome, send_batch_welcome,
+            threshold=WELCOME_BURST_THRESHOLD, window=60,
+            interval=WELCOME_BATCH_INTERVAL, batch_size=WELCOME_BATCH_SIZE
+        )
+        self.supervisor.register("welcomes", self.welcomes.run)
+        self.welcome_guide = None  # "Get Started" lines of the welcome message, built once the channels are known
+
+        # Joins during an invite challenge only request a recount; one runs per window
+        invite_challenge.recount_window = INVITE_RECOUNT_WINDOW
+        self.supervisor.register("invite_recount", invite_challenge.run_recounts)
+
+        # Operational metrics, optionally served to Prometheus
+        self.loop_lag = LoopLagMonitor(observe=lambda lag: timings.observe("loop.lag", lag))
+        self.supervisor.register("loop_lag", self.loop_lag.run)
+        metrics.counter("gagbot_fetch_total", "Stock fetches by source and outcome")
+        # The registry and the discord logger are process-wide: building another client replaces
+        # the collector instead of adding a second one, and the 429 counter is only attached once
+        metrics.add_collector("client", self.collect_metrics)
+        RateLimitCounter.attach(metrics)
+        if METRICS_PORT:
+            self.supervisor.register("metrics_server", MetricsServer(metrics, METRICS_HOST, METRICS_PORT).run)
         logging.info("Bot initialized with cached data")
         
         # Sync the fallback state to ensure consistency
         self.sync_fallback_state()
 
     def save_state(self):
-        """Save current state to cache."""
-        cache_data = {
+        """Mark the state as changed; the state store writes it after a short debounce."""
+        self.state_store.mark_dirty()
+
+    async def save_state_now(self):
+        """Write the state right away, for changes that must survive a crash."""
+        self.state_store.mark_dirty()
+        await self.state_store.flush()
+
+    def state_snapshot(self):
+        """Current state as it is written to the cache file."""
+        return {
             "last_data": self.last_data,
             "repeated_data_count": self.repeated_data_count,
             "is_website_broken": self.is_website_broken,
             "last_weather_alert": self.last_weather_alert,
-            "fallback_switch_time": self.fallback_switch_time
+            "fallback_switch_time": self.fallback_switch_time,
+            "live_boards": self.live_boards,
+            "webhooks": self.webhooks,
+            "command_tree_hash": self.command_tree_hash,
+            "role_message_id": self.role_message_id
         }
-        save_cache(cache_data)
-        logging.info("Bot state saved to cache")
+
+    def on_raw_member_update(self, data):
+        """Keep the role index current from every member update, cached member or not."""
+        before = self.role_index.apply_member_update(data)
+        if before is None:
+            return
+        member_id = int(data["user"]["id"])
+        guild = self.get_guild(self.role_index.guild_id)
+        # Cached members get on_member_update, which already runs the alert role check
+        if guild is not None and guild.get_member(member_id) is None and before != self.role_index.roles_of(member_id):
+            self.dispatch("uncached_member_update", guild, member_id)
 
     def sync_fallback_state(self):
         """Ensure the API fallback state is in sync with the bot's internal state."""
@@ -93,55 +245,112 @@ class MyClient(discord.Client):
             api_fallback.reset_fallback()
             logging.info("Synced API fallback state - reset to main")
 
+    def add_jobs(self):
+        """Register the recurring background jobs with the scheduler."""
+        self.scheduler.add_job("stock", self.stock_job, every=300, offset=self.stock_offset,
+                               deadline=280, misfire=COALESCE)
+        self.scheduler.add_job("weather", self.weather_alert_job, every=WEATHER_POLL_INTERVAL, jitter=2,
+                               deadline=WEATHER_POLL_INTERVAL * 0.75, misfire=SKIP)
+        self.scheduler.add_job("monitor", self.monitor_main_website, every=60, offset=30,
+                               deadline=300, misfire=SKIP)
+        self.scheduler.add_job("harvest", self.harvest_ping_job, every=3600, offset=0,
+                               deadline=60, misfire=SKIP, grace=120)
+
     async def monitor_main_website(self):
-        """Background task to monitor main website health every 15 minutes when in fallback mode."""
-        while True:
-            try:
-                if self.is_website_broken:
-                    # Wait at least 15 minutes before checking main website health
-                    # This gives the main website time to actually update its data
-                    logging.info("Monitoring main website health (checking every 15 minutes)...")
-                    
-                    # Check if we've been in fallback mode for at least 15 minutes
-                    if self.fallback_switch_time:
-                        time_since_switch = int(time.time()) - self.fallback_switch_time
-                        if time_since_switch < 900:  # 15 minutes = 900 seconds
-                            wait_time = 900 - time_since_switch
-                            logging.info(f"Waiting {wait_time} more seconds before checking main website health (minimum 15 minutes in fallback)")
-                            await asyncio.sleep(wait_time)
-                    
-                    main_api_working = await check_main_website_health()
-                    
-                    if main_api_working:
-                        logging.info("Main website health check passed - switching back to main API")
-                        self.is_website_broken = False
-                        self.fallback_switch_time = None
-                        self.just_restored_main_api = True
-                        channel = self.get_channel(STOCK_CHANNEL_ID)
-                        if channel:
-                            alert_embed = discord.Embed(
-                                title="✅ API Restored",
-                                description="The main API is back online. The bot will now use the main data source.",
-                                color=discord.Color.green()
-                            )
-                            await channel.send(alert_embed)
-                            logging.info("Website back online alert sent")
-                            await self.send_log("Website back online alert sent", "INFO")
-                            api_fallback.reset_fallback()
-                            self.save_state()
-                    else:
-                        logging.info("Main website health check failed - continuing with fallback API")
-                
-                # Wait 15 minutes before next check (instead of 5 minutes)
-                await asyncio.sleep(900)
-                
-            except Exception as e:
-                logging.error(f"Error in main website monitoring: {e}")
-                await asyncio.sleep(900)  # Wait 15 minutes before retrying
+        """
+        Checks main website health every 15 minutes while in fallback mode.
+        Scheduled every minute; returns straight away unless a check is due.
+        """
+        if not self.is_website_broken:
+            return
+
+        # Wait at least 15 minutes in fallback, and 15 minutes between checks.
+        # This gives the main website time to actually update its data
+        now = int(time.time())
+        if self.fallback_switch_time and now - self.fallback_switch_time < 900:
+            return
+        if self.last_health_check and now - self.last_health_check < 900:
+            return
+        self.last_health_check = now
+
+        logging.info("Monitoring main website health (checking every 15 minutes)...")
+        main_api_working = await check_main_website_health()
+
+        if main_api_working:
+            logging.info("Main website health check passed - switching back to main API")
+            self.is_website_broken = False
+            self.fallback_switch_time = None
+            self.just_restored_main_api = True
+            channel = self.get_channel(STOCK_CHANNEL_ID)
+            if channel:
+                alert_embed = discord.Embed(
+                    title="✅ API Restored",
+                    description="The main API is back online. The bot will now use the main data source.",
+                    color=discord.Color.green()
+                )
+                await self.deliver(channel, embed=alert_embed)
+                logging.info("Website back online alert sent")
+                await self.send_log("Website back online alert sent", "INFO")
+                api_fallback.reset_fallback()
+                self.save_state()
+        else:
+            logging.info("Main website health check failed - continuing with fallback API")
 
     async def setup_hook(self):
-        self.tree.add_command(calc_group)
-        await self.tree.sync()
+        if ROLE_PICKER:
+            # Registering the persistent view makes the menu on the existing role message work again after a restart
+            roles = {emoji: (role_id, ROLE_LABELS.get(emoji, "Alerts")) for emoji, role_id in EMOJI_ROLE_MAP.items()}
+            self.role_picker = RolePickerView(roles, apply_role_picker)
+            self.add_view(self.role_picker)
+        await self.sync_commands()
+
+    async def sync_commands(self, force=False):
+        """
+        Sync the slash commands with Discord, but only if they changed since the
+        last sync (a global sync is rate-limited and slows down restarts).
+        Returns the number of synced commands, or None if the sync was skipped.
+        """
+        tree_hash = command_tree_hash(self.tree, self.application_id)
+        if not force and tree_hash == self.command_tree_hash:
+            logging.info("Slash commands unchanged since the last sync - skipping sync")
+            return None
+        synced = await self.tree.sync()
+        self.command_tree_hash = tree_hash
+        self.save_state()
+        logging.info(f"Synced {len(synced)} slash commands")
+        return len(synced)
+
+    async def close(self):
+        """Stop the background tasks, then write pending state and ship buffered log lines before disconnecting."""
+        await self.supervisor.shutdown()
+        await self.state_store.flush()
+        try:
+            await self.log_shipper.flush()
+        except Exception as e:
+            logging.error(f"Failed to flush log shipper on shutdown: {e}")
+        if self.webhook_delivery:
+            await self.webhook_delivery.close()
+        await weather_probe.close()
+        metrics.remove_collector("client", self.collect_metrics)
+        await super().close()
+
+    async def deliver(self, channel, **kwargs):
+        """Send a stock post or alert, through the channel webhook when webhook delivery is on."""
+        with timings.span("discord.send"):
+            if self.webhook_delivery:
+                return await self.webhook_delivery.send(channel, **kwargs)
+            return await channel.send(**kwargs)
+
+    async def edit_delivered(self, channel, message_id, webhook=True, **kwargs):
+        """
+        Edit a message sent with deliver(); `webhook` says whether it went out through
+        the channel webhook or fell back to a normal send. Returns False if there is
+        nothing to edit it with.
+        """
+        if self.webhook_delivery and webhook:
+            return await self.webhook_delivery.edit(channel, message_id, **kwargs) is not None
+        await channel.get_partial_message(message_id).edit(**kwargs)
+        return True
 
     async def post_stock(self):
         try:
@@ -176,7 +385,7 @@ class MyClient(discord.Client):
                                     description="The main API appears to be unavailable. The bot will temporarily switch to the backup API and check the main API every 15 minutes until it's back up. Results may be slightly delayed.",
                                     color=discord.Color.orange()
                                 )
-                                await channel.send(embed=alert_embed)
+                                await self.deliver(channel, embed=alert_embed)
                                 logging.warning("Website unavailable alert sent - switching to API fallback")
                                 await self.send_log("Website unavailable alert sent - switching to API fallback", "WARNING")
                                 
@@ -205,7 +414,7 @@ class MyClient(discord.Client):
                                 description="The main API appears to be unavailable. The bot will temporarily switch to the backup API and check the main API every 15 minutes until it's back up. Results may be slightly delayed.",
                                 color=discord.Color.orange()
                             )
-                            await channel.send(embed=alert_embed)
+                            await self.deliver(channel, embed=alert_embed)
                             logging.warning("Website unavailable alert sent - switching to API fallback")
                             await self.send_log("Website unavailable alert sent - switching to API fallback", "WARNING")
                             
@@ -223,200 +432,275 @@ class MyClient(discord.Client):
                     # The main website monitoring task handles API restoration automatically
                     # No need to check here since we have a dedicated background task
             if stock_data:
-                channel = self.get_channel(STOCK_CHANNEL_ID)
-                if channel is None:
-                    error_msg = "Stock channel not found"
-                    logging.error(error_msg)
-                    await self.send_log(error_msg, "ERROR")
-                    return False
+                # Render the snapshot once, then deliver it to every subscribed server
                 embed = format_embed(stock_data)
-                await channel.send(embed=embed)
+                matches = match_stock_alerts(stock_data)
+                with timings.span("stock.deliver"):
+                    delivered = await self.fan_out(embed, matches, snapshot_hash(stock_data))
+                if not delivered:
+                    return False
                 self.last_data = stock_data.copy()
                 self.save_state()
-                # Then send pings with item summaries
-                mentions = []
-
-                # Role IDs (for pings)
-                mythical_seed_role_id = EMOJI_ROLE_MAP.get("🦄")
-                legendary_seed_role_id = EMOJI_ROLE_MAP.get("🌟")
-                rare_seed_role_id = EMOJI_ROLE_MAP.get("🔥")
-                gear_role_id = EMOJI_ROLE_MAP.get("🧰")
-                egg_role_id = EMOJI_ROLE_MAP.get("🥚")
-                weather_role_id = EMOJI_ROLE_MAP.get("🌧️")
-
-                # Keywords to watch for (lowercase for matching)
-                mythical_seed_keywords = {"pineapple", "kiwi", "pear", "bell"}
-                legendary_seed_keywords = {"watermelon", "green apple", "avocado", "banana"}
-                gear_keywords = {"lightning", "master", "godly", "friendship", "mirror"}
-                egg_keywords = {"bug", "mythical", "paradise"}
-
-                mythical_seed_matches = [s for s in stock_data.get("seeds", []) if any(k in s.lower() for k in mythical_seed_keywords)]
-                legendary_seed_matches = [s for s in stock_data.get("seeds", []) if any(k in s.lower() for k in legendary_seed_keywords)]
-                gear_matches = [g for g in stock_data.get("gear", []) if any(k in g.lower() for k in gear_keywords)]
-                egg_matches = [e for e in stock_data.get("egg", []) if any(k in e.lower() for k in egg_keywords)]
-
-                # Remove duplicates while preserving order
-                mythical_seed_matches = list(dict.fromkeys(mythical_seed_matches))
-                legendary_seed_matches = list(dict.fromkeys(legendary_seed_matches))
-                gear_matches = list(dict.fromkeys(gear_matches))
-                egg_matches = list(dict.fromkeys(egg_matches))
-
-                # Send each alert type in a separate message
-                if mythical_seed_matches and mythical_seed_role_id:
-                    mention_text = f"<@&{mythical_seed_role_id}>\n**🦄 Mythical Seeds:**\n" + "\n".join(mythical_seed_matches)
-                    await channel.send(mention_text)
-
-                if legendary_seed_matches and legendary_seed_role_id:
-                    mention_text = f"<@&{legendary_seed_role_id}>\n**🌟 Legendary Seeds:**\n" + "\n".join(legendary_seed_matches)
-                    await channel.send(mention_text)
-
-                # Special alert for rare seeds
-                try:
-                    # More precise matching for rare seeds
-                    rare_seeds = []
-                    all_seeds_lower = [s.lower() for s in stock_data.get("seeds", [])]
-                    
-                    for seed_name_original in stock_data.get("seeds", []):
-                        seed_lower = seed_name_original.lower()
-                        if "ember lily" in seed_lower or "emberlily" in seed_lower:
-                            rare_seeds.append(("ember", seed_name_original))
-                        elif "beanstalk" in seed_lower:
-                            rare_seeds.append(("beanstalk", seed_name_original))
-                        elif "sugar apple" in seed_lower:
-                            rare_seeds.append(("sugar_apple", seed_name_original))
-                        elif "loquat" in seed_lower:
-                            rare_seeds.append(("loquat", seed_name_original))
-                        elif "feijoa" in seed_lower:
-                            rare_seeds.append(("feijoa", seed_name_original))
-
-                    if rare_seeds:
-                        news_channel = self.get_channel(NEWS_CHANNEL_ID)
-                        if news_channel and rare_seed_role_id:
-                            for seed_type, seed_name in rare_seeds:
-                                alert_text = ""
-                                if seed_type == "ember":
-                                    alert_text = f"<@&{rare_seed_role_id}> 🔥 **EMBER LILY ALERT!!!** 🔥\n{seed_name} is now in the shop!!!"
-                                    await channel.send(alert_text)
-                                elif seed_type == "beanstalk":
-                                    alert_text = f"<@&{rare_seed_role_id}> 🌱 **BEANSTALK ALERT!!!** 🌱\n{seed_name} is now in the shop!!!"
-                                    await channel.send(alert_text)
-                                elif seed_type == "sugar_apple":
-                                    alert_text = f"<@&{rare_seed_role_id}> 🍎 **SUGAR APPLE ALERT!!!** 🍎\n{seed_name} is now in the shop!!!"
-                                    await news_channel.send(alert_text)
-                                elif seed_type == "loquat":
-                                    alert_text = f"<@&{rare_seed_role_id}> 🍈 **LOQUAT ALERT!!!** 🍈\n{seed_name} is now in the shop!!!"
-                                    await channel.send(alert_text)
-                                elif seed_type == "feijoa":
-                                    alert_text = f"<@&{rare_seed_role_id}> 🍐 **FEIJOA ALERT!!!** 🍐\n{seed_name} is now in the shop!!!"
-                                    await channel.send(alert_text)
-                                
-                                await self.send_log(f"Rare seed alert sent: {seed_name}", "INFO")
-                        else:
-                            if not news_channel:
-                                error_msg = "Could not find news channel for rare seed alerts"
-                                logging.error(error_msg)
-                                await self.send_log(error_msg, "ERROR")
-                            if not rare_seed_role_id:
-                                error_msg = "Rare seed role ID not found in EMOJI_ROLE_MAP"
-                                logging.error(error_msg)
-                                await self.send_log(error_msg, "ERROR")
-                except Exception as e:
-                    error_msg = f"Error sending rare seed alert: {e}"
-                    logging.error(error_msg, exc_info=True)
-                    await self.send_log(error_msg, "ERROR")
-
-                if gear_matches and gear_role_id:
-                    mention_text = f"<@&{gear_role_id}>\n**🧰 Gear:**\n" + "\n".join(gear_matches)
-                    await channel.send(mention_text)
-
-                # Only send egg pings every 30 minutes (with 3-minute window)
-                now = datetime.now(PHOENIX_TZ)
-                if egg_matches and now.minute % 30 < 3 and egg_role_id:
-                    mention_text = f"<@&{egg_role_id}>\n**🥚 Eggs:**\n" + "\n".join(egg_matches)
-                    await channel.send(mention_text)
-
                 return True
             return False
         except Exception as e:
             logging.error(f"Error in post_stock: {e}")
             return False
 
-    async def stock_loop(self):
-        while True:
+    def stock_targets(self):
+        """The home server from config.py followed by every subscribed server."""
+        targets = [{
+            "name": "home server",
+            "stock_channel_id": STOCK_CHANNEL_ID,
+            "news_channel_id": NEWS_CHANNEL_ID,
+            "roles": EMOJI_ROLE_MAP
+        }]
+        home_guild_id = self.home_guild_id()
+        for guild_id, settings in guild_configs.subscribed():
+            # The home server already gets every snapshot, whichever channel it subscribed with
+            if settings["stock_channel_id"] == STOCK_CHANNEL_ID or guild_id == home_guild_id:
+                continue
+            targets.append(dict(settings, name=f"server {guild_id}"))
+        return targets
+
+    def home_guild_id(self):
+        """ID of the server that owns STOCK_CHANNEL_ID, or None while the channel is not cached."""
+        channel = self.get_channel(STOCK_CHANNEL_ID)
+        return channel.guild.id if channel else None
+
+    async def fan_out(self, embed, matches, board_hash):
+        """
+        Delivers one rendered snapshot to every subscribed server concurrently.
+        At most FANOUT_CONCURRENCY deliveries run at once and each one is cut off
+        after FANOUT_TIMEOUT seconds, so a slow or failing server cannot hold up
+        the rest. Returns True if at least one server got the update.
+        """
+        targets = self.stock_targets()
+        semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
+
+        async def deliver_to(target):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self.deliver_snapshot(target, embed, matches, board_hash),
+                        timeout=FANOUT_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    error_msg = f"Stock delivery to {target['name']} timed out after {FANOUT_TIMEOUT}s"
+                except Exception as e:
+                    error_msg = f"Stock delivery to {target['name']} failed: {e}"
+                logging.error(error_msg)
+                await self.send_log(error_msg, "ERROR")
+                return False
+
+        results = await asyncio.gather(*(deliver_to(target) for target in targets))
+        if len(targets) > 1:
+            logging.info(f"Delivered stock update to {sum(results)}/{len(targets)} servers")
+        return any(results)
+
+    async def deliver_snapshot(self, target, embed, matches, board_hash):
+        """Posts a rendered snapshot and its alerts to one server's channels."""
+        channel = self.get_channel(target["stock_channel_id"])
+        if channel is None:
+            error_msg = f"Stock channel not found for {target['name']}"
+            logging.error(error_msg)
+            await self.send_log(error_msg, "ERROR")
+            return False
+        alerts = bind_alerts(matches, target["roles"])
+
+        # Rare seed alerts need the news channel to be reachable, as before.
+        # Servers without a news channel get them in their stock channel.
+        if target.get("news_channel_id"):
+            news_channel = self.get_channel(target["news_channel_id"])
+        else:
+            news_channel = channel
+        if not news_channel and any(alert["rare"] for alert in alerts):
+            error_msg = f"Could not find news channel for rare seed alerts in {target['name']}"
+            logging.error(error_msg)
+            await self.send_log(error_msg, "ERROR")
+            alerts = [alert for alert in alerts if not alert["rare"]]
+
+        live_board = target.get("live_board", LIVE_BOARD_MODE)
+        if target.get("digest", DIGEST_MODE) and not live_board:
+            await self.send_digest(channel, news_channel, embed, alerts)
+            return True
+
+        if live_board:
+            await self.update_live_board(channel, embed, board_hash)
+        else:
+            await self.deliver(channel, embed=embed)
+
+        # Then send each alert type in a separate message
+        for alert in alerts:
             try:
-                now = datetime.now(PHOENIX_TZ)
-                if self.is_website_broken:
-                    minutes_since_5min_mark = now.minute % 5
-                    seconds_into_5min_block = minutes_since_5min_mark * 60 + now.second
-                    
-                    # Wait until 90 seconds past the next 5-minute mark
-                    # e.g., if it's 12:02, wait for 12:05 + 90s = 12:06:30
-                    wait_seconds = (300 - seconds_into_5min_block) + 90
-                    
-                    if self.just_switched_to_fallback:
-                        logging.info(f"Just switched to fallback - will wait {wait_seconds} seconds for first fallback post at next 5-min mark + 1:30")
-                        self.just_switched_to_fallback = False
-                        await asyncio.sleep(wait_seconds)
-                        now = datetime.now(PHOENIX_TZ)
-                    else:
-                        logging.info(f"Using backup API - will send at next 5-minute mark + 1:30 (waiting {wait_seconds} seconds)")
-                        await asyncio.sleep(wait_seconds)
+                alert_channel = news_channel if alert["news"] else channel
+                await self.deliver(alert_channel, content=alert["text"])
+                if alert["rare"]:
+                    await self.send_log(f"Rare seed alert sent: {alert['items'][0]}", "INFO")
+            except Exception as e:
+                error_msg = f"Error sending {alert['title']} alert: {e}"
+                logging.error(error_msg, exc_info=True)
+                await self.send_log(error_msg, "ERROR")
+        return True
+
+    async def update_live_board(self, channel, embed, board_hash):
+        """
+        Keeps a single persistent stock message in the channel up to date.
+        The message is only edited when the snapshot hash changes, and is sent
+        again if it has been deleted. Returns True if anything was written.
+        """
+        board = self.live_boards.get(str(channel.id))
+        if board and board.get("hash") == board_hash:
+            if await self.live_board_exists(channel, board):
+                logging.info("Live stock board unchanged - skipping edit")
+                return False
+            board = None
+
+        message_id = None
+        via_webhook = board.get("webhook", True) if board else True
+        if board and board.get("message_id"):
+            try:
+                if await self.edit_delivered(channel, board["message_id"], webhook=via_webhook, embed=embed):
+                    message_id = board["message_id"]
+                    logging.info(f"Edited live stock board (ID: {message_id})")
                 else:
-                    seconds_since_5min_mark = (now.minute % 5) * 60 + now.second
-                    wait_seconds = 300 - seconds_since_5min_mark
-                    next_update_minute = ((now.minute // 5) * 5 + 5) % 60
-                    if self.just_restored_main_api:
-                        logging.info(f"Just restored main API - will wait {wait_seconds} seconds for first main API post at next 5-min mark")
-                        self.just_restored_main_api = False
-                        await asyncio.sleep(wait_seconds)
-                        now = datetime.now(PHOENIX_TZ)
-                    else:
-                        logging.info(f"Using main API - will send at {now.hour:02d}:{next_update_minute:02d}:00 (waiting {wait_seconds} seconds)")
-                        await asyncio.sleep(wait_seconds)
-                    # Add a 7-second delay before posting when using main API
-                    logging.info("Main API: Waiting an additional 7 seconds to ensure data is fresh.")
-                    await asyncio.sleep(7)
-                max_retries = 5
-                retry_delay = 5
-                success = False
-                last_result = None
-                for attempt in range(max_retries):
-                    try:
-                        result = await self.post_stock()
-                        last_result = result
-                        if result == "switched_to_fallback":
-                            logging.info("Switched to fallback - will wait for fallback delay before posting any fallback update.")
-                            success = False
-                            break
-                        elif result:
-                            logging.info("Successfully posted stock update")
-                            success = True
-                            break
-                        else:
-                            logging.info(f"Attempt {attempt + 1}/{max_retries}: No changes detected, retrying...")
-                            if attempt < max_retries - 1:
-                                await asyncio.sleep(retry_delay)
-                    except Exception as e:
-                        error_msg = f"Attempt {attempt + 1}/{max_retries} failed: {e}"
-                        logging.error(error_msg, exc_info=True)
-                        await self.send_log(error_msg, "ERROR")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(retry_delay)
-                # If we just switched to fallback, immediately restart the loop so fallback logic is used
-                if last_result == "switched_to_fallback":
+                    # No webhook left to edit it with: remove it so the new board does not sit next to it
+                    await self.delete_board(channel, board["message_id"])
+            except (discord.NotFound, discord.Forbidden):
+                logging.warning(f"Live stock board {board['message_id']} can no longer be edited - sending a new one")
+                await self.delete_board(channel, board["message_id"])
+
+        if message_id is None:
+            message = await self.deliver(channel, embed=embed)
+            message_id = message.id
+            via_webhook = isinstance(message, discord.WebhookMessage)
+            logging.info(f"Sent new live stock board (ID: {message_id})")
+
+        self.live_boards[str(channel.id)] = {"message_id": message_id, "hash": board_hash, "webhook": via_webhook}
+        self.verified_boards.add(channel.id)
+        return True
+
+    async def live_board_exists(self, channel, board):
+        """
+        Whether the board message is still there. Deletions while the bot runs arrive
+        as events (forget_live_board), so it is only fetched once per channel after a
+        start, to catch boards deleted while the bot was offline.
+        """
+        if channel.id in self.verified_boards:
+            return True
+        try:
+            await channel.fetch_message(board["message_id"])
+        except discord.NotFound:
+            logging.warning(f"Live stock board {board['message_id']} was deleted - sending a new one")
+            return False
+        except discord.HTTPException as e:
+            logging.warning(f"Could not check live stock board {board['message_id']}: {e}")
+            return True
+        self.verified_boards.add(channel.id)
+        return True
+
+    def forget_live_board(self, channel_id, message_ids):
+        """Drop a live board whose message was deleted, so the next stock cycle sends it again."""
+        board = self.live_boards.get(str(channel_id))
+        if board and board.get("message_id") in message_ids:
+            del self.live_boards[str(channel_id)]
+            self.verified_boards.discard(channel_id)
+            self.save_state()
+            logging.info(f"Live stock board {board['message_id']} was deleted - it is sent again on the next stock cycle")
+
+    async def delete_board(self, channel, message_id):
+        """Remove an old live board that is being replaced (it may already be gone)."""
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            logging.warning(f"Could not delete old live stock board {message_id}: {e}")
+
+    async def send_digest(self, channel, news_channel, embed, alerts):
+        """
+        Posts a whole stock cycle as one message: the stock embed, one embed per
+        alert category and a single content line with every triggered role mention.
+        Alerts meant for the news channel are still sent there separately.
+        """
+        digest_alerts = [alert for alert in alerts if not alert["news"]]
+        messages = format_digest(embed, digest_alerts)
+        for message in messages:
+            await self.deliver(channel, **message)
+        logging.info(f"Sent stock digest with {len(digest_alerts)} alerts in {len(messages)} message(s)")
+
+        for alert in alerts:
+            if alert["news"]:
+                try:
+                    await self.deliver(news_channel, content=alert["text"])
+                except Exception as e:
+                    error_msg = f"Error sending {alert['title']} alert: {e}"
+                    logging.error(error_msg, exc_info=True)
+                    await self.send_log(error_msg, "ERROR")
                     continue
-                if not success:
-                    logging.warning("Failed to post stock update after all retries")
-                    await self.send_log("Failed to post stock update after all retries", "WARNING")
+            # Alerts that are not news alerts went out with the digest above
+            if alert["rare"]:
+                await self.send_log(f"Rare seed alert sent: {alert['items'][0]}", "INFO")
+
+    def stock_offset(self):
+        """Seconds past each 5-minute mark to post: +7s on the main website, +1:30 on the backup API."""
+        return 90 if self.is_website_broken else 7
+
+    async def stock_job(self):
+        """Posts a stock update. Scheduled every 5 minutes at stock_offset()."""
+        if self.just_switched_to_fallback:
+            logging.info("First post since switching to fallback - posting at 5-minute mark + 1:30")
+            self.just_switched_to_fallback = False
+        elif self.just_restored_main_api:
+            logging.info("First post since restoring main API - posting at 5-minute mark + 7s")
+            self.just_restored_main_api = False
+        elif self.is_website_broken:
+            log_throttled("stock-source", "Using backup API - posting at 5-minute mark + 1:30", interval=3600)
+        else:
+            log_throttled("stock-source", "Using main API - posting at 5-minute mark + 7s to ensure data is fresh", interval=3600)
+
+        max_retries = 5
+        retry_delay = 5
+        success = False
+        last_result = None
+        for attempt in range(max_retries):
+            try:
+                result = await self.post_stock()
+                last_result = result
+                if result == "switched_to_fallback":
+                    logging.info("Switched to fallback - will wait for fallback delay before posting any fallback update.")
+                    success = False
+                    break
+                elif result:
+                    logging.info("Successfully posted stock update")
+                    # End-to-end lateness: from the 5-minute mark this run belongs to until the post went out
+                    scheduled = self.scheduler.jobs["stock"].next_run
+                    if scheduled:
+                        timings.observe("stock.lateness", time.time() - scheduled // 300 * 300)
+                    success = True
+                    break
+                else:
+                    logging.info(f"Attempt {attempt + 1}/{max_retries}: No changes detected, retrying...")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(retry_delay)
             except Exception as e:
-                error_msg = f"Error in stock loop: {e}"
+                error_msg = f"Attempt {attempt + 1}/{max_retries} failed: {e}"
                 logging.error(error_msg, exc_info=True)
                 await self.send_log(error_msg, "ERROR")
-                await asyncio.sleep(60)
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(retry_delay)
+        # After switching to fallback the first fallback post waits for the next 5-minute mark + 1:30,
+        # not +1:30 of the mark this run belongs to
+        if last_result == "switched_to_fallback":
+            scheduled = self.scheduler.jobs["stock"].next_run
+            self.scheduler.defer("stock", scheduled // 300 * 300 + 300)
+            return
+        if not success:
+            logging.warning("Failed to post stock update after all retries")
+            await self.send_log("Failed to post stock update after all retries", "WARNING")
 
-    async def harvest_ping_loop(self):
-        """Sends a ping for the harvest event every hour."""
-        await self.wait_until_ready()
+    async def harvest_ping_job(self):
+        """Sends a ping for the harvest event. Scheduled at the top of every hour."""
         channel = self.get_channel(HARVEST_CHANNEL_ID)
         if not channel:
             logging.error(f"Could not find harvest channel with ID {HARVEST_CHANNEL_ID} for harvest ping.")
@@ -427,25 +711,22 @@ class MyClient(discord.Client):
             logging.error("Harvest ping role ID not found in EMOJI_ROLE_MAP.")
             return
 
-        while True:
-            now = datetime.now(PHOENIX_TZ)
-            # Calculate seconds until the next hour
-            wait_seconds = 3600 - (now.minute * 60 + now.second + now.microsecond / 1_000_000)
-            logging.info(f"Next harvest ping will be in {wait_seconds:.2f} seconds.")
-            await asyncio.sleep(wait_seconds)
-
-            try:
-                message = f"<@&{harvest_role_id}> 🌽 It's time for the hourly harvest! 🌽"
-                await channel.send(message)
-                logging.info("Sent hourly harvest ping.")
-                await self.send_log("Sent hourly harvest ping.", "INFO")
-            except Exception as e:
-                logging.error(f"Failed to send harvest ping: {e}")
-                await self.send_log(f"Failed to send harvest ping: {e}", "ERROR")
-
-    async def weather_alert_loop(self):
-        """Checks for special weather alerts every minute."""
-        await self.wait_until_ready()
+        try:
+            message = f"<@&{harvest_role_id}> 🌽 It's time for the hourly harvest! 🌽"
+            await self.deliver(channel, content=message)
+            logging.info("Sent hourly harvest ping.")
+            await self.send_log("Sent hourly harvest ping.", "INFO")
+        except Exception as e:
+            logging.error(f"Failed to send harvest ping: {e}")
+            await self.send_log(f"Failed to send harvest ping: {e}", "ERROR")
+
+    async def weather_alert_job(self):
+        """
+        Checks for special weather alerts. Scheduled every WEATHER_POLL_INTERVAL seconds;
+        reads only the weather section, and falls back to a full scrape at most every 5 minutes.
+        While in fallback mode the website is stale, so the weather comes from the backup
+        API instead, at most once a minute.
+        """
         channel = self.get_channel(WEATHER_CHANNEL_ID)
         if not channel:
             logging.error(f"Could not find weather channel with ID {WEATHER_CHANNEL_ID} for weather alerts.")
@@ -456,62 +737,59 @@ class MyClient(discord.Client):
             logging.error("Weather alert role ID not found in EMOJI_ROLE_MAP.")
             return
 
-        # Counter to track when to log (every 5 minutes)
-        log_counter = 0
-
-        while True:
-            try:
-                # Calculate seconds until the next minute
-                now = datetime.now(PHOENIX_TZ)
-                seconds_since_minute_mark = now.second
-                wait_seconds = 60 - seconds_since_minute_mark
-                
-                # Only log every 5 minutes
-                if log_counter % 5 == 0:
-                    logging.info(f"Weather check - will send at next minute mark + 7s (waiting {wait_seconds} seconds)")
-                await asyncio.sleep(wait_seconds)
-                
-                # Add a 7-second delay before checking weather
-                if log_counter % 5 == 0:
-                    logging.info("Weather check: Waiting an additional 7 seconds to ensure data is fresh.")
-                await asyncio.sleep(7)
-                
-                stock_data = await fetch_all_stock()
-                weather_items = stock_data.get("weather", [])
-
-                if weather_items:
-                    # Get the most recent weather
-                    current_weather = weather_items[0].lower()
-                    # Check if it's a special weather (not rain, frost, snow, or windy)
-                    if not any(weather in current_weather for weather in ["rain", "frost", "snow", "windy"]):
-                        # Only ping if it's different from the last alert
-                        if current_weather != self.last_weather_alert:
-                            # Clean up weather text by removing "- Most Recent"
-                            weather_text = weather_items[0].replace(" - Most Recent", "")
-                            mention_text = f"<@&{weather_role_id}>\n**🌧️ Special Weather Alert:**\n{weather_text}"
-                            await channel.send(mention_text)
-                            self.last_weather_alert = current_weather
-                            self.save_state()  # Save state after weather alert
-                            logging.info(f"Sent weather alert for: {current_weather}")
-                            await self.send_log(f"Weather alert sent: {current_weather}", "INFO")
-                        else:
-                            # Only log skipped alerts every 5 minutes
-                            if log_counter % 5 == 0:
-                                logging.info(f"Skipped weather alert for {current_weather} as it's the same as last alert")
-
-                # Increment counter
-                log_counter += 1
-
-            except Exception as e:
-                logging.error(f"Error in weather_alert_loop: {e}", exc_info=True)
-                await self.send_log(f"Error in weather_alert_loop: {e}", "ERROR")
-                await asyncio.sleep(60) # Wait a minute before retrying on error
+        if self.is_website_broken or api_fallback.is_using_fallback:
+            if time.time() - self.last_weather_scrape < 60:
+                return
+            self.last_weather_scrape = time.time()
+            stock_data = await fetch_all_stock()
+            weather_items = stock_data.get("weather", [])
+            changed = False
+        else:
+            weather_items, changed = await weather_probe.check()
+        if weather_items is None:
+            if time.time() - self.last_weather_scrape < 300:
+                return
+            self.last_weather_scrape = time.time()
+            logging.info("Weather probe unavailable, falling back to a full scrape")
+            stock_data = await fetch_all_stock()
+            weather_items = stock_data.get("weather", [])
+        elif changed:
+            logging.info(f"Weather changed to: {weather_items[0] if weather_items else 'none'}")
+
+        if weather_items:
+            # Get the most recent weather
+            current_weather = weather_items[0].lower()
+            # Check if it's a special weather (not rain, frost, snow, or windy)
+            if not any(weather in current_weather for weather in ["rain", "frost", "snow", "windy"]):
+                # Only ping if it's different from the last alert
+                if current_weather != self.last_weather_alert:
+                    # Clean up weather text by removing "- Most Recent"
+                    weather_text = weather_items[0].replace(" - Most Recent", "")
+                    mention_text = f"<@&{weather_role_id}>\n**🌧️ Special Weather Alert:**\n{weather_text}"
+                    await self.deliver(channel, content=mention_text)
+                    self.last_weather_alert = current_weather
+                    self.save_state()  # Save state after weather alert
+                    logging.info(f"Sent weather alert for: {current_weather}")
+                    await self.send_log(f"Weather alert sent: {current_weather}", "INFO")
+                else:
+                    # Routine checks are only logged every 5 minutes
+                    log_throttled("weather-unchanged", f"Skipped weather alert for {current_weather} as it's the same as last alert")
 
     async def on_ready(self):
         """Called when the bot is ready and connected to Discord."""
         logging.info(f'Logged in as {self.user} (ID: {self.user.id})')
         logging.info('------')
-        
+
+        # Start the background tasks (no-op for tasks that are already running)
+        self.supervisor.start()
+
+        if self.ready_once:
+            logging.info("Reconnected - background tasks are already running")
+            # A new session may have missed member events while disconnected
+            await load_role_index()
+            return
+        self.ready_once = True
+
         # Send initial stock data to test channel
         try:
             test_channel = self.get_channel(TEST_CHANNEL_ID)
@@ -537,26 +815,15 @@ class MyClient(discord.Client):
         except Exception as e:
             logging.error(f"Failed to send initial data: {e}")
         
-        # Start the stock loop
-        asyncio.create_task(self.stock_loop())
-        
-        # Start the main website monitoring task
-        asyncio.create_task(self.monitor_main_website())
-        
-        # Start the hourly harvest ping loop
-        asyncio.create_task(self.harvest_ping_loop())
-        
-        # Start the weather alert loop
-        asyncio.create_task(self.weather_alert_loop())
-        
         # Send role message if needed
         await send_role_message()
         
-        # Check all members' roles
+        # Index the alert role holders, then check all members' roles
+        await load_role_index()
         await check_all_members_roles()
 
     async def send_log(self, content, level="INFO"):
-        """Send a log message to the Discord logs channel."""
+        """Queue a log message for the Discord logs channel."""
         try:
             # Only send ERROR level logs and website status changes
             if (level == "ERROR" or 
@@ -564,22 +831,119 @@ class MyClient(discord.Client):
                 "Website back online alert sent" in content or
                 "switching to API fallback" in content or
                 "API fallback" in content):
-                channel = self.get_channel(self.logs_channel_id)
-                if channel:
-                    # Format the message with timestamp and level
-                    timestamp = datetime.now(PHOENIX_TZ).strftime("%Y-%m-%d %H:%M:%S")
-                    formatted_message = f"[{timestamp}] [{level}] {content}"
-                    await channel.send(f"```{formatted_message}```")
+                timestamp = datetime.now(PHOENIX_TZ).strftime("%Y-%m-%d %H:%M:%S")
+                self.log_shipper.submit(content, level, timestamp)
         except Exception as e:
-            logging.error(f"Failed to send log to Discord: {e}")
-
-client = MyClient()
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
-
-# Global variable to store the ID of the role-selection message
-ROLE_MESSAGE_ID = None
-
+            logging.error(f"Failed to queue log for Discord: {e}")
+
+    def collect_metrics(self):
+        """Metric families read from the bot's state at scrape time."""
+        yield ("gagbot_fallback_active", "gauge", "1 while stock comes from the backup API",
+               [({}, int(self.is_website_broken))])
+        yield ("gagbot_repeated_data_count", "gauge", "Consecutive fetches that returned unchanged seeds",
+               [({}, self.repeated_data_count)])
+
+        probe = weather_probe.get_metrics()
+        yield ("gagbot_weather_probe_total", "counter", "Weather probe lookups by result",
+               [({"result": "request"}, probe["requests"]), ({"result": "cache_hit"}, probe["cache_hits"]),
+                ({"result": "not_modified"}, probe["not_modified"]), ({"result": "failure"}, probe["failures"])])
+        yield ("gagbot_weather_changes_total", "counter", "Weather changes seen by the probe",
+               [({}, probe["changes"])])
+
+        log_metrics = self.log_shipper.get_metrics()
+        yield ("gagbot_log_lines_total", "counter", "Lines submitted to the Discord logs channel by outcome",
+               [({"outcome": "flushed"}, log_metrics["flushed_entries"]), ({"outcome": "coalesced"}, log_metrics["coalesced"]),
+                ({"outcome": "dropped"}, log_metrics["dropped"])])
+        state_metrics = self.state_store.get_metrics()
+        yield ("gagbot_state_writes_total", "counter", "Cache file writes",
+               [({"outcome": "written"}, state_metrics["written"]), ({"outcome": "failed"}, state_metrics["failures"])])
+
+        yield from timing_families(timings)
+        yield ("gagbot_event_loop_lag_seconds", "gauge", "How late the event loop woke up from a 1 second sleep",
+               [({}, self.loop_lag.last_lag)])
+        yield ("gagbot_event_loop_lag_max_seconds", "gauge", "Worst event loop lag since startup",
+               [({}, self.loop_lag.max_lag)])
+
+        tasks = self.supervisor.status()
+        yield ("gagbot_task_up", "gauge", "1 while a supervised background task is running",
+               [({"task": task["name"]}, int(task["status"] == "running")) for task in tasks])
+        yield ("gagbot_task_restarts_total", "counter", "Restarts of each supervised background task",
+               [({"task": task["name"]}, task["restarts"]) for task in tasks])
+        jobs = self.scheduler.status()
+        yield ("gagbot_job_runs_total", "counter", "Scheduled job runs by result",
+               [({"job": job["name"], "result": result}, job[key]) for job in jobs
+                for result, key in (("run", "runs"), ("failed", "failures"), ("timed_out", "timeouts"), ("missed", "missed"))])
+        yield ("gagbot_job_lateness_seconds", "gauge", "How late the last run of each job started",
+               [({"job": job["name"]}, job["last_lateness"]) for job in jobs if job["last_lateness"] is not None])
+
+        challenges = invite_challenge.challenges.values()
+        yield ("gagbot_invite_challenges", "gauge", "Invite challenges in the store",
+               [({"state": "active"}, sum(1 for c in challenges if c.get("active"))),
+                ({"state": "ended"}, sum(1 for c in challenges if not c.get("active")))])
+        yield ("gagbot_invite_participants", "gauge", "Participants across all stored invite challenges",
+               [({}, sum(len(c.get("participants", {})) for c in challenges))])
+        try:
+            store_bytes = os.path.getsize(invite_challenge.data_file)
+        except OSError:
+            store_bytes = 0
+        yield ("gagbot_invite_store_bytes", "gauge", "Size of the invite challenge file",
+               [({}, store_bytes)])
+        yield ("gagbot_role_members", "gauge", "Members holding each watched role, from the role index",
+               [({"role": str(role_id)}, count) for role_id, count in self.role_index.get_metrics().items()])
+        reconcile = self.role_reconciler.get_metrics()
+        yield ("gagbot_role_reconcile_pending", "gauge", "Alert role changes left in the current reconcile run",
+               [({}, reconcile["pending"])])
+        yield ("gagbot_role_reconcile_total", "counter", "Alert role changes processed by the current reconcile run",
+               [({"result": "changed"}, reconcile["done"]), ({"result": "unchanged"}, reconcile["skipped"]),
+                ({"result": "failed"}, reconcile["failed"])])
+        alert_master = self.alert_master.get_metrics()
+        yield ("gagbot_alert_master_total", "counter", "Alert Master checks by outcome",
+               [({"result": result}, alert_master[result]) for result in ("added", "removed", "echoes", "in_flight_skips", "unchanged")])
+        reactions = self.reaction_roles.get_metrics()
+        yield ("gagbot_reaction_roles_total", "counter", "Role message reactions and the role updates they led to",
+               [({"result": "reaction"}, reactions["reactions"]), ({"result": "edit"}, reactions["edits"]),
+                ({"result": "unchanged"}, reactions["unchanged"]), ({"result": "failed"}, reactions["failures"])])
+        recounts = invite_challenge.recount_metrics
+        yield ("gagbot_invite_recounts_total", "counter", "Invite recount requests and the recounts they were combined into",
+               [({"result": "requested"}, recounts["requests"]), ({"result": "recounted"}, recounts["recounts"]),
+                ({"result": "failed"}, recounts["failures"])])
+        welcomes = self.welcomes.get_metrics()
+        yield ("gagbot_member_joins_total", "counter", "Members who joined the server",
+               [({}, welcomes["joins"])])
+        yield ("gagbot_join_rate_per_minute", "gauge", "Joins per minute over the last minute",
+               [({}, welcomes["join_rate"])])
+        yield ("gagbot_join_burst", "gauge", "1 while welcomes are batched because of a join burst",
+               [({}, welcomes["burst"])])
+        yield ("gagbot_join_bursts_total", "counter", "Join bursts detected",
+               [({}, welcomes["bursts"])])
+        yield ("gagbot_welcome_messages_total", "counter", "Welcome messages sent by mode",
+               [({"mode": "single"}, welcomes["single_welcomes"]), ({"mode": "batch"}, welcomes["batch_welcomes"])])
+        yield ("gagbot_welcomed_in_batch_total", "counter", "Members welcomed through a batched message",
+               [({}, welcomes["batched_members"])])
+        yield ("gagbot_subscribed_guilds", "gauge", "Servers subscribed to stock updates",
+               [({}, len(guild_configs.subscribed()))])
+        yield ("gagbot_process_resident_memory_bytes", "gauge", "Resident memory of the bot process",
+               [({}, process_rss_bytes())])
+
+    async def ship_logs(self, text):
+        """Send one batch of log lines from the log shipper to the logs channel."""
+        channel = self.get_channel(self.logs_channel_id)
+        if channel is None:
+            raise RuntimeError(f"Logs channel {self.logs_channel_id} not found")
+        await channel.send(text)
+
+client = None  # Built by create_client()
+
+# Marks the role-selection message when searching the channel for it
+ROLE_MESSAGE_HEADER = "React below to get alert roles!"
+
+def record_fetch(source, stock_data):
+    """Count a fetch from one source as ok or empty; returns the data unchanged."""
+    outcome = "ok" if stock_data and any(stock_data.values()) else "empty"
+    metrics.inc("gagbot_fetch_total", source=source, outcome=outcome)
+    return stock_data
+
+@timings.timed("stock.fetch")
 async def fetch_all_stock():
     """
     Fetches stock data using the scraper and formats it for the bot.
@@ -590,16 +954,20 @@ async def fetch_all_stock():
         # Check if we should use fallback API
         if client.is_website_broken or api_fallback.is_using_fallback:
             logging.info("Using fallback API due to main website issues")
-            stock_data = await api_fallback.fetch_stock_data()
+            stock_data = record_fetch("api", await api_fallback.fetch_stock_data())
         else:
             # Try main website first
-            stock_data = await fetch_stock_data()
+            if BROWSER_SCRAPING:
+                stock_data = record_fetch("scrape", await fetch_stock_data())
+            else:
+                stock_data = record_fetch("http", await fetch_stock_data_http())
             
             # If main website returned empty data, try fallback
             if not stock_data or all(not items for items in stock_data.values()):
                 logging.info("Main website returned empty data, trying fallback API")
-                stock_data = await api_fallback.fetch_stock_data()
+                stock_data = record_fetch("api", await api_fallback.fetch_stock_data())
 
+        normalize_started = time.perf_counter()
         # Normalize keys: support both singular and plural forms
         normalized = {
             "seeds": stock_data.get("seeds", []),
@@ -625,20 +993,19 @@ async def fetch_all_stock():
                 name = get_name(item)
                 if name:
                     results[key].append(name)
+        timings.observe("stock.normalize", time.perf_counter() - normalize_started)
         return results
     except Exception as e:
         logging.warning(f"Failed to fetch stock: {e}")
         return {"seeds": [], "gear": [], "egg": [], "weather": []}
 
+@timings.timed("health.check")
 async def check_main_website_health() -> bool:
     """
     Check if the main website is accessible and working.
     Returns True if the website is healthy AND returning fresh data, False otherwise.
     """
     try:
-        import aiohttp
-        from bs4 import BeautifulSoup
-        
         url = "https://growagardenvalues.com/stock/stocks.php"
         
         async with aiohttp.ClientSession() as session:
@@ -657,8 +1024,11 @@ async def check_main_website_health() -> bool:
                 # Now check if the data is fresh by fetching actual stock data
                 # and comparing it with the last known data
                 try:
-                    from scraper import fetch_stock_data
-                    fresh_data = await fetch_stock_data()
+                    if BROWSER_SCRAPING:
+                        fresh_data = await fetch_stock_data()
+                    else:
+                        # The page we just downloaded already has the stock
+                        fresh_data = parse_stock_page(content)
                     
                     if not fresh_data or all(not items for items in fresh_data.values()):
                         logging.warning("Main website health check failed - returned empty data")
@@ -685,6 +1055,134 @@ async def check_main_website_health() -> bool:
         logging.error(f"Main website health check failed: {e}")
         return False
 
+# Keywords to watch for (lowercase for matching)
+MYTHICAL_SEED_KEYWORDS = {"pineapple", "kiwi", "pear", "bell"}
+LEGENDARY_SEED_KEYWORDS = {"watermelon", "green apple", "avocado", "banana"}
+GEAR_KEYWORDS = {"lightning", "master", "godly", "friendship", "mirror"}
+EGG_KEYWORDS = {"bug", "mythical", "paradise"}
+
+# Rare seeds: (keywords, emoji, alert label, posted to the news channel)
+RARE_SEED_ALERTS = [
+    (("ember lily", "emberlily"), "🔥", "EMBER LILY", False),
+    (("beanstalk",), "🌱", "BEANSTALK", False),
+    (("sugar apple",), "🍎", "SUGAR APPLE", True),
+    (("loquat",), "🍈", "LOQUAT", False),
+    (("feijoa",), "🍐", "FEIJOA", False),
+]
+
+def match_stock_alerts(stock_data, now=None):
+    """
+    Works out which alerts a stock snapshot triggers, in posting order.
+    The result does not depend on any server's roles, so it is computed once
+    per snapshot and then bound to each server's roles with bind_alerts().
+    """
+    now = now or datetime.now(PHOENIX_TZ)
+    seeds = stock_data.get("seeds", [])
+    matches = []
+
+    def add_category(emoji, title, items, keywords):
+        # Remove duplicates while preserving order
+        found = list(dict.fromkeys(i for i in items if any(k in i.lower() for k in keywords)))
+        if found:
+            matches.append({
+                "emoji": emoji,
+                "title": title,
+                "items": found,
+                "body": f"\n**{title}:**\n" + "\n".join(found),
+                "news": False,
+                "rare": False
+            })
+
+    add_category("🦄", "🦄 Mythical Seeds", seeds, MYTHICAL_SEED_KEYWORDS)
+    add_category("🌟", "🌟 Legendary Seeds", seeds, LEGENDARY_SEED_KEYWORDS)
+
+    # Special alert for rare seeds
+    for seed_name in seeds:
+        seed_lower = seed_name.lower()
+        for keywords, emoji, label, news in RARE_SEED_ALERTS:
+            if any(k in seed_lower for k in keywords):
+                matches.append({
+                    "emoji": "🔥",
+                    "title": f"{emoji} {label} ALERT!!! {emoji}",
+                    "items": [seed_name],
+                    "body": f" {emoji} **{label} ALERT!!!** {emoji}\n{seed_name} is now in the shop!!!",
+                    "news": news,
+                    "rare": True
+                })
+                break
+
+    add_category("🧰", "🧰 Gear", stock_data.get("gear", []), GEAR_KEYWORDS)
+
+    # Only send egg pings every 30 minutes (with 3-minute window)
+    if now.minute % 30 < 3:
+        add_category("🥚", "🥚 Eggs", stock_data.get("egg", []), EGG_KEYWORDS)
+
+    return matches
+
+def bind_alerts(matches, role_map):
+    """
+    Attaches a server's alert roles to matched alerts.
+    Each alert gains the role to ping and its plain-text message; alerts whose
+    role is not configured for the server are left out.
+    """
+    alerts = []
+    for match in matches:
+        role_id = role_map.get(match["emoji"])
+        if not role_id:
+            continue
+        alerts.append(dict(match, role_id=role_id, text=f"<@&{role_id}>{match['body']}"))
+    return alerts
+
+def collect_stock_alerts(stock_data, now=None, role_map=None):
+    """Works out which role pings a stock snapshot triggers for a single server."""
+    return bind_alerts(match_stock_alerts(stock_data, now), role_map or EMOJI_ROLE_MAP)
+
+def format_digest(embed, alerts):
+    """
+    Renders a stock embed and its alerts as digest messages (send() kwargs).
+    Usually this is a single message; it only spills over when the alerts need
+    more embeds than Discord allows in one message.
+    """
+    alert_embeds = []
+    for alert in alerts:
+        alert_embed = discord.Embed(
+            title=alert["title"],
+            description="\n".join(alert["items"]),
+            color=discord.Color.red() if alert["rare"] else discord.Color.gold()
+        )
+        alert_embeds.append((alert["role_id"], alert_embed))
+
+    messages = []
+    first = True
+    while first or alert_embeds:
+        room = MAX_EMBEDS_PER_MESSAGE - 1 if first else MAX_EMBEDS_PER_MESSAGE
+        batch, alert_embeds = alert_embeds[:room], alert_embeds[room:]
+        role_ids = list(dict.fromkeys(role_id for role_id, _ in batch))
+        message = {
+            "embeds": ([embed] if first else []) + [e for _, e in batch],
+            "allowed_mentions": discord.AllowedMentions(
+                everyone=False,
+                users=False,
+                roles=[discord.Object(id=role_id) for role_id in role_ids]
+            )
+        }
+        if role_ids:
+            message["content"] = " ".join(f"<@&{role_id}>" for role_id in role_ids)
+        messages.append(message)
+        first = False
+    return messages
+
+def command_tree_hash(tree, application_id=None):
+    """Stable hash of the global slash commands: names, descriptions, options, choices and permissions."""
+    payload = sorted((command.to_dict() for command in tree.get_commands()), key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps([application_id, payload], sort_keys=True).encode()).hexdigest()
+
+def snapshot_hash(stock_data):
+    """Stable hash of the shop contents of a snapshot, ignoring its timestamp."""
+    snapshot = {key: stock_data.get(key, []) for key in ("seeds", "gear", "egg")}
+    return hashlib.sha1(json.dumps(snapshot, sort_keys=True).encode()).hexdigest()
+
+@timings.timed("stock.format")
 def format_embed(data):
     def has_content(lst):
         return bool(lst) and any(str(x).strip() for x in lst)
@@ -726,7 +1224,7 @@ def format_embed(data):
     embed.set_footer(text="Grow A Garden Stock Bot")
     return embed
 
-@client.tree.command(name="hi", description="Learn about the bot and its features")
+@app_commands.command(name="hi", description="Learn about the bot and its features")
 async def hi(interaction: discord.Interaction):
     stock_channel = client.get_channel(STOCK_CHANNEL_ID)
     role_channel = client.get_channel(ROLE_CHANNEL_ID)
@@ -768,33 +1266,42 @@ async def send_role_message():
     """
     Sends a message listing available alert roles with corresponding emojis.
     Users can react to this message to obtain or remove roles.
+
+    The message ID is kept in the bot state, so normally this is one fetch;
+    the channel history is only searched if that message is gone.
     """
-    global ROLE_MESSAGE_ID
     channel = client.get_channel(ROLE_CHANNEL_ID)
     if channel is None:
         logging.warning(f"Role channel ID {ROLE_CHANNEL_ID} not found.")
         return
 
-    # Check if a role message already exists
-    async for message in channel.history(limit=100):
-        if message.author == client.user and "React below to get alert roles!" in message.content:
-            ROLE_MESSAGE_ID = message.id
-            logging.info(f"Found existing role message (ID: {ROLE_MESSAGE_ID})")
-            
-            # Ensure all reactions are present
-            current_reactions = [str(reaction.emoji) for reaction in message.reactions]
-            for emoji in EMOJI_ROLE_MAP:
-                if emoji not in current_reactions:
-                    await message.add_reaction(emoji)
-                    logging.info(f"Added missing reaction {emoji}")
+    message = None
+    if client.role_message_id:
+        try:
+            message = await channel.fetch_message(client.role_message_id)
+        except discord.NotFound:
+            logging.warning(f"Stored role message {client.role_message_id} no longer exists, searching the channel")
+        except discord.HTTPException as e:
+            # Don't post a duplicate because of a temporary error; the stored ID still works for reactions
+            logging.error(f"Could not fetch role message {client.role_message_id}: {e}")
             return
+    if message is None:
+        message = await find_role_message(channel)
+
+    if message is not None:
+        if message.id != client.role_message_id:
+            client.role_message_id = message.id
+            client.save_state()
+            logging.info(f"Found existing role message (ID: {message.id})")
+        await reconcile_role_message(message)
+        return
 
     # If no existing message found, send a new one
     stock_channel = client.get_channel(STOCK_CHANNEL_ID)
     harvest_channel = client.get_channel(HARVEST_CHANNEL_ID)
     weather_channel = client.get_channel(WEATHER_CHANNEL_ID)
     text = (
-        "**React below to get alert roles!**\n\n"
+        f"**{ROLE_MESSAGE_HEADER}**\n\n"
         f"🦄 – Mythical Seeds Alerts (Get notified about mythical seeds in {stock_channel.mention})\n"
         f"🌟 – Legendary Seeds Alerts (Get notified about legendary seeds in {stock_channel.mention})\n"
         f"🔥 – Rare Seeds Alerts (Get notified about rare seeds in {stock_channel.mention})\n"
@@ -804,54 +1311,107 @@ async def send_role_message():
         f"🌽 – Harvest Ping (Get notified about the hourly harvest event in {harvest_channel.mention})\n\n"
         "**✨ Special Feature:** If you have the Gear, Egg, and Rare Seed roles (🧰, 🥚, 🔥), you'll automatically get the Alert Master role!"
     )
-    message = await channel.send(text)
+    if client.role_picker:
+        text += "\n\nOr press **Choose alert roles** below to pick all your alert roles at once."
+        message = await channel.send(text, view=client.role_picker)
+    else:
+        message = await channel.send(text)
 
     for emoji in EMOJI_ROLE_MAP:
         await message.add_reaction(emoji)
 
-    ROLE_MESSAGE_ID = message.id
-    logging.info(f"Sent new role-selection message (ID: {ROLE_MESSAGE_ID})")
+    client.role_message_id = message.id
+    client.save_state()
+    logging.info(f"Sent new role-selection message (ID: {message.id})")
+
+async def find_role_message(channel):
+    """Repair step: search recent channel history for a role message the bot posted earlier."""
+    async for message in channel.history(limit=100):
+        if message.author == client.user and ROLE_MESSAGE_HEADER in message.content:
+            return message
+    return None
+
+async def reconcile_role_message(message):
+    """Bring the reactions and the role picker on the role message in line with the config, from one fetched copy."""
+    own_reactions = {str(reaction.emoji) for reaction in message.reactions if reaction.me}
+    missing = [emoji for emoji in EMOJI_ROLE_MAP if emoji not in own_reactions]
+    stale = own_reactions - set(EMOJI_ROLE_MAP)
+    for emoji in missing:
+        await message.add_reaction(emoji)
+    for emoji in stale:
+        await message.remove_reaction(emoji, client.user)
+    if missing or stale:
+        logging.info(f"Role message reactions: added {missing}, removed {sorted(stale)}")
+
+    # Older role messages don't have the role picker yet, or still carry an older layout of it
+    if client.role_picker:
+        custom_ids = {child.custom_id for row in message.components for child in getattr(row, "children", [])}
+        if custom_ids != client.role_picker.custom_ids():
+            await message.edit(view=client.role_picker)
+            logging.info("Updated the role picker on the role message")
+
+async def apply_role_picker(interaction: discord.Interaction, selected):
+    """
+    Give the user exactly the alert roles they picked in the role picker, in one role update.
+    The picker opens with their current roles selected, so roles they leave selected are kept.
+    """
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    changes = {role_id: role_id in selected for role_id in EMOJI_ROLE_MAP.values()}
+    member = await client.reaction_roles.current_member(interaction.guild, interaction.user.id)
+    added, removed = await client.reaction_roles.edit(member, changes, "Role picker")
+    if not added and not removed:
+        await interaction.followup.send("Your alert roles are already up to date.", ephemeral=True)
+        return
+    lines = []
+    if added:
+        lines.append(f"✅ Added: {', '.join(added)}")
+    if removed:
+        lines.append(f"➖ Removed: {', '.join(removed)}")
+    await interaction.followup.send("\n".join(lines), ephemeral=True)
 
 async def check_and_assign_alert_role(member):
     """
-    Checks if a member has all three required roles and assigns the alert role if they do.
+    Gives or takes the alert role so it matches whether the member has all three required roles.
+    Does nothing when it already matches or the bot's own change is still on its way.
     """
     try:
-        # Get role IDs from the map
-        rare_seed_role_id = EMOJI_ROLE_MAP.get("🔥")
-        egg_role_id = EMOJI_ROLE_MAP.get("🥚")
-        gear_role_id = EMOJI_ROLE_MAP.get("🧰")
-
-        if not all([rare_seed_role_id, egg_role_id, gear_role_id]):
-            logging.error("One or more role IDs for alert role check are missing from EMOJI_ROLE_MAP.")
-            return
-
-        # Get all three required roles (rare seeds, egg, gear)
-        rare_seed_role = member.guild.get_role(rare_seed_role_id)
-        egg_role = member.guild.get_role(egg_role_id)
-        gear_role = member.guild.get_role(gear_role_id)
-        alert_role = member.guild.get_role(ALERT_ROLE_ID)
-
-        if not all([rare_seed_role, egg_role, gear_role, alert_role]):
-            logging.error("One or more roles for alert role check not found in the server")
-            return
-
-        # Check if member has all three required roles (rare seeds, eggs, gear)
-        has_all_roles = all(role in member.roles for role in [rare_seed_role, egg_role, gear_role])
-        
-        # Add or remove alert role based on whether they have all three required roles
-        if has_all_roles and alert_role not in member.roles:
-            await member.add_roles(alert_role)
-            logging.info(f"Added alert role to {member.display_name}")
-        elif not has_all_roles and alert_role in member.roles:
-            await member.remove_roles(alert_role)
-            logging.info(f"Removed alert role from {member.display_name}")
+        await client.alert_master.sync(member)
     except Exception as e:
         logging.error(f"Error in check_and_assign_alert_role: {e}", exc_info=True)
 
+async def load_role_index():
+    """
+    Build the role index for the home server. With the full member cache the
+    cached members are used; otherwise the members are requested once without
+    caching them.
+    """
+    channel = client.get_channel(ROLE_CHANNEL_ID)
+    if not channel or not channel.guild:
+        logging.error("Role channel not found, role index not loaded")
+        return
+    guild = channel.guild
+    try:
+        with timings.span("roles.index_load"):
+            members = guild.members if guild.chunked else await guild.chunk(cache=False)
+            client.role_index.load(guild.id, members)
+    except Exception as e:
+        logging.error(f"Failed to load role index: {e}", exc_info=True)
+
+async def get_member(guild, member_id):
+    """A member from the cache, or fetched from Discord. Returns None if they left."""
+    member = guild.get_member(member_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(member_id)
+    except discord.NotFound:
+        client.role_index.remove(member_id)
+        return None
+
 async def check_all_members_roles():
     """
-    Checks all members' roles and assigns the alert role if they have all three required roles.
+    Works out which members need the alert role added or removed and hands
+    that plan to the role reconciler, which applies it in the background.
     """
     try:
         channel = client.get_channel(ROLE_CHANNEL_ID)
@@ -865,103 +1425,150 @@ async def check_all_members_roles():
             return
 
         # Get role IDs from the map
-        rare_seed_role_id = EMOJI_ROLE_MAP.get("🔥")
-        egg_role_id = EMOJI_ROLE_MAP.get("🥚")
-        gear_role_id = EMOJI_ROLE_MAP.get("🧰")
-
-        if not all([rare_seed_role_id, egg_role_id, gear_role_id]):
+        required_role_ids = [EMOJI_ROLE_MAP.get(emoji) for emoji in ALERT_MASTER_EMOJIS]
+        if not all(required_role_ids):
             logging.error("One or more role IDs for alert role check are missing from EMOJI_ROLE_MAP.")
             return
 
-        # Get all required roles
-        rare_seed_role = guild.get_role(rare_seed_role_id)
-        egg_role = guild.get_role(egg_role_id)
-        gear_role = guild.get_role(gear_role_id)
+        if not all(guild.get_role(role_id) for role_id in required_role_ids):
+            logging.error("One or more roles for alert role check not found in the server")
+            return
         alert_role = guild.get_role(ALERT_ROLE_ID)
-
-        if not all([rare_seed_role, egg_role, gear_role, alert_role]):
+        if not alert_role:
             logging.error("One or more roles for alert role check not found in the server")
             return
 
-        # Check all members
-        for member in guild.members:
-            if not member.bot:  # Skip bots
-                has_all_roles = all(role in member.roles for role in [rare_seed_role, egg_role, gear_role])
-                
-                # Add or remove alert role based on whether they have all three roles
-                if has_all_roles and alert_role not in member.roles:
-                    await member.add_roles(alert_role)
-                    logging.info(f"Added alert role to {member.display_name}")
-                elif not has_all_roles and alert_role in member.roles:
-                    await member.remove_roles(alert_role)
-                    logging.info(f"Removed alert role from {member.display_name}")
+        index = client.role_index
+        if index.guild_id != guild.id:
+            logging.warning("Role index not loaded, skipping the alert role check")
+            return
+
+        # Compare role holders as ID sets instead of looping over every member (bots are skipped)
+        with timings.span("roles.scan"):
+            should_have = index.members_with_all(required_role_ids)
+            has = index.members_with(ALERT_ROLE_ID) - index.bots
+            to_add = should_have - has
+            to_remove = has - should_have
+        client.role_reconciler.submit(to_add, to_remove)
 
     except Exception as e:
         logging.error(f"Error in check_all_members_roles: {e}", exc_info=True)
 
-@client.event
+async def apply_alert_role_change(member_id, action):
+    """
+    Add or remove the alert role for one member of a reconcile plan. A
+    resumed plan can be stale, so members whose roles no longer call for
+    `action` are skipped (their member update already handles them).
+    Returns False if there was nothing to change.
+    """
+    channel = client.get_channel(ROLE_CHANNEL_ID)
+    if not channel or not channel.guild:
+        raise RuntimeError("Role channel not found")
+    member = await get_member(channel.guild, member_id)
+    if member is None:
+        return False
+    if client.alert_master.desired({role.id for role in member.roles}) != (action == ADD):
+        logging.debug(f"Skipping planned alert role {action} for {member.display_name}: their roles changed since")
+        return False
+    return await client.alert_master.sync(member)
+
 async def on_member_update(before, after):
     """
     Checks for role changes and updates alert role accordingly.
     """
     # Only proceed if roles have changed
     if before.roles != after.roles:
+        if after.id == client.user.id:
+            client.reaction_roles.invalidate()  # The bot's own roles decide what it may assign
+            return
         await check_and_assign_alert_role(after)
 
-@client.event
+async def on_uncached_member_update(guild, member_id):
+    """
+    Alert role check for a member outside the member cache whose watched roles
+    changed (see MyClient.on_raw_member_update). The member is only fetched if
+    their alert role is actually wrong.
+    """
+    index = client.role_index
+    if member_id in index.bots or client.alert_master.needs_change(member_id, set(index.roles_of(member_id))) is None:
+        return
+    member = await get_member(guild, member_id)
+    if member:
+        await check_and_assign_alert_role(member)
+
+async def on_raw_member_remove(payload):
+    """Drop members who leave from the role index."""
+    if payload.guild_id == client.role_index.guild_id:
+        client.role_index.remove(payload.user.id)
+
+def welcome_guide():
+    """The "Get Started" part of the welcome message; the channel lookups are only done until they succeed."""
+    if client.welcome_guide:
+        return client.welcome_guide
+    role_channel = client.get_channel(ROLE_CHANNEL_ID)
+    about_channel = client.get_channel(ABOUT_CHANNEL_ID)
+    if not role_channel or not about_channel:
+        # Fallback if channels not found
+        return (f"**Get Started:**\n"
+                f"• Check out our stock updates in <#{STOCK_CHANNEL_ID}>\n"
+                f"• Go to <#{ABOUT_CHANNEL_ID}> to learn more about the bot\n\n")
+    client.welcome_guide = (f"**Get Started:**\n"
+                            f"• Visit {role_channel.mention} to set up your alert roles\n"
+                            f"• Check out our stock updates in <#{STOCK_CHANNEL_ID}>\n"
+                            f"• Go to {about_channel.mention} to learn more about the bot\n\n")
+    return client.welcome_guide
+
+async def send_welcome(member):
+    """Welcome one new member in the welcome channel."""
+    welcome_channel = client.get_channel(WELCOME_CHANNEL_ID)
+    if not welcome_channel:
+        return
+    welcome_embed = discord.Embed(
+        title="🎉 Welcome to SCGAGS",
+        description=f"Hello {member.mention}! Welcome\n\n"
+                    f"{welcome_guide()}"
+                    f"We're excited to have you here! 🌱",
+        color=discord.Color.green()
+    )
+    welcome_embed.set_thumbnail(url=member.display_avatar.url)
+    welcome_embed.set_footer(text="Grow A Garden Community")
+    await welcome_channel.send(embed=welcome_embed)
+    logging.info(f"Sent welcome message for {member.display_name}")
+
+async def send_batch_welcome(members, more):
+    """Welcome a batch of new members (plus `more` who are only counted) in one message."""
+    welcome_channel = client.get_channel(WELCOME_CHANNEL_ID)
+    if not welcome_channel:
+        return
+    greeting = ", ".join(member.mention for member in members)
+    if more:
+        greeting += f" and {more} more"
+    welcome_embed = discord.Embed(
+        title="🎉 Welcome to SCGAGS",
+        description=f"Hello {greeting}! Welcome\n\n"
+                    f"{welcome_guide()}"
+                    f"We're excited to have you all here! 🌱",
+        color=discord.Color.green()
+    )
+    welcome_embed.set_footer(text=f"Grow A Garden Community • {len(members) + more} new members")
+    await welcome_channel.send(embed=welcome_embed)
+    logging.info(f"Sent batch welcome message for {len(members) + more} members")
+
 async def on_member_join(member):
     """
     Handle new member joins and update invite tracking, plus check roles.
     """
+    if member.guild.id == client.role_index.guild_id:
+        client.role_index.update(member.id, (role.id for role in member.roles), member.bot)
+
     try:
-        # Send welcome message
-        welcome_channel = client.get_channel(WELCOME_CHANNEL_ID)
-        if welcome_channel:
-            role_channel = client.get_channel(ROLE_CHANNEL_ID)
-            about_channel = client.get_channel(ABOUT_CHANNEL_ID)
-            if role_channel and about_channel:
-                welcome_embed = discord.Embed(
-                    title="🎉 Welcome to SCGAGS",
-                    description=f"Hello {member.mention}! Welcome\n\n"
-                               f"**Get Started:**\n"
-                               f"• Visit {role_channel.mention} to set up your alert roles\n"
-                               f"• Check out our stock updates in <#{STOCK_CHANNEL_ID}>\n"
-                               f"• Go to {about_channel.mention} to learn more about the bot\n\n"
-                               f"We're excited to have you here! 🌱",
-                    color=discord.Color.green()
-                )
-                welcome_embed.set_thumbnail(url=member.display_avatar.url)
-                welcome_embed.set_footer(text="Grow A Garden Community")
-                await welcome_channel.send(embed=welcome_embed)
-                logging.info(f"Sent welcome message for {member.display_name}")
-            else:
-                # Fallback if channels not found
-                welcome_embed = discord.Embed(
-                    title="🎉 Welcome to SCGAGS",
-                    description=f"Hello {member.mention}! Welcome\n\n"
-                               f"**Get Started:**\n"
-                               f"• Check out our stock updates in <#{STOCK_CHANNEL_ID}>\n"
-                               f"• Go to <#{ABOUT_CHANNEL_ID}> to learn more about the bot\n\n"
-                               f"We're excited to have you here! 🌱",
-                    color=discord.Color.green()
-                )
-                welcome_embed.set_thumbnail(url=member.display_avatar.url)
-                welcome_embed.set_footer(text="Grow A Garden Community")
-                await welcome_channel.send(embed=welcome_embed)
-                logging.info(f"Sent welcome message for {member.display_name}")
-        
+        # Welcome them (in a batch during a join burst)
+        await client.welcomes.submit(member)
+
         # Check if there's an active challenge
-        active_challenge = invite_challenge.get_active_challenge(member.guild.id)
-        if active_challenge:
-            # Auto-join the new member to the challenge
-            await invite_challenge.auto_join_new_member(active_challenge["id"], member.guild, member.id)
-            
-            # Update all participants' invite counts
-            for user_id in active_challenge["participants"]:
-                current_invites = await invite_challenge.get_user_invite_count(member.guild, int(user_id))
-                invite_challenge.update_participant_invites(active_challenge["id"], int(user_id), current_invites)
-            
-            logging.info(f"Updated invite counts for challenge {active_challenge['id']} after {member.display_name} joined")
+        if invite_challenge.get_active_challenge(member.guild.id):
+            # Auto-join the new member and recount everyone's invites (combined with other joins in the window)
+            invite_challenge.request_recount(member.guild, member.id)
         
     except Exception as e:
         logging.error(f"Error in on_member_join: {e}")
@@ -969,111 +1576,44 @@ async def on_member_join(member):
     # Check new member's roles and assign alert role if they have all required roles
     await check_and_assign_alert_role(member)
 
-@client.event
 async def on_raw_reaction_add(payload):
     """
     Assigns a role when a user adds a reaction on the role-selection message.
     """
-    logging.info(f"Reaction added: {payload.emoji} by user {payload.user_id} on message {payload.message_id}")
-    
-    if payload.message_id != ROLE_MESSAGE_ID:
-        logging.info(f"Ignoring reaction on message {payload.message_id} (not role message)")
-        return
-
-    guild = client.get_guild(payload.guild_id)
-    if guild is None:
-        logging.warning(f"Could not find guild {payload.guild_id}")
-        return
-
-    role_id = EMOJI_ROLE_MAP.get(str(payload.emoji))
-    if role_id is None:
-        logging.warning(f"No role mapping found for emoji {payload.emoji}")
-        return
+    logging.debug(f"Reaction added: {payload.emoji} by user {payload.user_id} on message {payload.message_id}")
+    await handle_role_reaction(payload, add=True)
 
-    try:
-        member = await guild.fetch_member(payload.user_id)
-        role = guild.get_role(role_id)
-        
-        if not role:
-            logging.error(f"Role with ID {role_id} not found in the server")
-            return
-            
-        if not member:
-            logging.error(f"Member with ID {payload.user_id} not found in the server")
-            return
-            
-        # Check if bot has permission to manage roles
-        bot_member = guild.get_member(client.user.id)
-        if not bot_member.guild_permissions.manage_roles:
-            logging.error("Bot does not have 'Manage Roles' permission")
-            return
-            
-        # Check if bot's role is higher than the role it's trying to assign
-        bot_role = bot_member.top_role
-        if bot_role.position <= role.position:
-            logging.error(f"Bot's role ({bot_role.name}) must be higher than the role it's trying to assign ({role.name})")
-            return
-            
-        await member.add_roles(role)
-        logging.info(f"Successfully assigned role {role.name} to {member.display_name}")
-        
-        # Check if they should get the alert role
-        await check_and_assign_alert_role(member)
-        
-    except discord.Forbidden as e:
-        logging.error(f"Permission error when assigning role: {e}")
-        if "Missing Permissions" in str(e):
-            logging.error("Bot needs 'Manage Roles' permission and its role must be higher than the roles it's trying to assign")
-    except Exception as e:
-        logging.error(f"Failed to assign role on reaction add: {e}", exc_info=True)
-
-@client.event
 async def on_raw_reaction_remove(payload):
     """
     Removes a role when a user removes a reaction on the role-selection message.
     """
-    if payload.message_id != ROLE_MESSAGE_ID:
+    await handle_role_reaction(payload, add=False)
+
+async def handle_role_reaction(payload, add):
+    """Queue the role change for a reaction; ReactionRoles batches each user's reactions into one update."""
+    if payload.message_id != client.role_message_id or payload.user_id == client.user.id:
         return
 
     guild = client.get_guild(payload.guild_id)
     if guild is None:
+        logging.warning(f"Could not find guild {payload.guild_id}")
         return
 
-    role_id = EMOJI_ROLE_MAP.get(str(payload.emoji))
-    if role_id is None:
-        return
+    if not client.reaction_roles.toggle(guild, payload.user_id, str(payload.emoji), add):
+        logging.warning(f"No role mapping found for emoji {payload.emoji}")
 
-    try:
-        member = await guild.fetch_member(payload.user_id)
-        role = guild.get_role(role_id)
-        
-        if not role or not member:
-            return
-            
-        # Check if bot has permission to manage roles
-        bot_member = guild.get_member(client.user.id)
-        if not bot_member.guild_permissions.manage_roles:
-            logging.error("Bot does not have 'Manage Roles' permission")
-            return
-            
-        # Check if bot's role is higher than the role it's trying to remove
-        bot_role = bot_member.top_role
-        if bot_role.position <= role.position:
-            logging.error(f"Bot's role ({bot_role.name}) must be higher than the role it's trying to remove ({role.name})")
-            return
-            
-        await member.remove_roles(role)
-        logging.info(f"Removed role {role.name} from {member.display_name}")
-        
-        # Check if they should still have the alert role
-        await check_and_assign_alert_role(member)
-        
-    except discord.Forbidden as e:
-        logging.error(f"Permission error when removing role: {e}")
-        if "Missing Permissions" in str(e):
-            logging.error("Bot needs 'Manage Roles' permission and its role must be higher than the roles it's trying to remove")
-    except Exception as e:
-        logging.error(f"Failed to remove role on reaction remove: {e}", exc_info=True)
+async def on_guild_role_update(before, after):
+    """Role positions or permissions changed, so the reaction role checks need working out again."""
+    client.reaction_roles.invalidate()
+
+async def on_guild_role_delete(role):
+    client.reaction_roles.invalidate()
+
+async def on_raw_message_delete(payload):
+    client.forget_live_board(payload.channel_id, {payload.message_id})
+
+async def on_raw_bulk_message_delete(payload):
+    client.forget_live_board(payload.channel_id, payload.message_ids)
 
 # Define the command group for /calc
 calc_group = app_commands.Group(name="calc", description="Calculate crop value or list mutations")
@@ -1173,7 +1713,7 @@ async def calc_weights(interaction: discord.Interaction):
         await client.send_log(error_msg, "ERROR")
         await interaction.response.send_message("❌ An error occurred while fetching plant weights. Please try again later.", ephemeral=True)
 
-@client.tree.command(name="update", description="Send today's updates to the updates channel")
+@app_commands.command(name="update", description="Send today's updates to the updates channel")
 async def send_update(interaction: discord.Interaction):
     """Send today's updates to the updates channel."""
     try:
@@ -1215,7 +1755,7 @@ async def send_update(interaction: discord.Interaction):
         await interaction.client.send_log(error_msg, "ERROR")
         await interaction.response.send_message("❌ An error occurred while sending the update. Please try again later.", ephemeral=True)
 
-@client.tree.command(name="purge", description="Delete messages in the current channel")
+@app_commands.command(name="purge", description="Delete messages in the current channel")
 @app_commands.describe(
     amount="Number of messages to delete (default: 100, max: 1000)",
     user="Only delete messages from this user (optional)"
@@ -1264,7 +1804,7 @@ async def purge_error(interaction: discord.Interaction, error: app_commands.AppC
     else:
         await interaction.response.send_message("❌ An error occurred while trying to delete messages.", ephemeral=True)
 
-@client.tree.command(name="switch", description="Switch between main website and API fallback (Admin only)")
+@app_commands.command(name="switch", description="Switch between main website and API fallback (Admin only)")
 @app_commands.describe(
     source="Choose which data source to use"
 )
@@ -1316,7 +1856,7 @@ async def switch_source_error(interaction: discord.Interaction, error: app_comma
         await interaction.response.send_message("An error occurred while switching data sources.", ephemeral=True)
         logging.error(f"Switch source error: {error}")
 
-@client.tree.command(name="send", description="Send current stock data to the test channel")
+@app_commands.command(name="send", description="Send current stock data to the test channel")
 @app_commands.checks.has_permissions(administrator=True)
 async def send_test(interaction: discord.Interaction):
     """Send current stock data to the test channel."""
@@ -1348,7 +1888,7 @@ async def send_test_error(interaction: discord.Interaction, error: app_commands.
     else:
         await interaction.response.send_message("❌ An error occurred while sending stock data.", ephemeral=True)
 
-@client.tree.command(name="health", description="Check the health of the fallback API endpoints and main website")
+@app_commands.command(name="health", description="Check the health of the fallback API endpoints and main website")
 @app_commands.checks.has_permissions(administrator=True)
 async def check_health(interaction: discord.Interaction):
     """Check the health of the fallback API endpoints and main website."""
@@ -1393,6 +1933,24 @@ async def check_health(interaction: discord.Interaction):
             value=fallback_status,
             inline=False
         )
+
+        # Add log shipper counters
+        log_metrics = client.log_shipper.get_metrics()
+        embed.add_field(
+            name="📨 Log Shipper",
+            value=f"Flushed: {log_metrics['flushed_entries']} lines in {log_metrics['flushed_messages']} messages\n"
+                  f"Coalesced: {log_metrics['coalesced']} | Dropped: {log_metrics['dropped']} | Buffered: {log_metrics['buffered']}",
+            inline=False
+        )
+        
+        # Add weather probe counters
+        weather_metrics = weather_probe.get_metrics()
+        embed.add_field(
+            name="🌦️ Weather Probe",
+            value=f"Requests: {weather_metrics['requests']} | Not modified: {weather_metrics['not_modified']} | Cache hits: {weather_metrics['cache_hits']}\n"
+                  f"Changes: {weather_metrics['changes']} | Failures: {weather_metrics['failures']}",
+            inline=False
+        )
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
         
@@ -1409,7 +1967,174 @@ async def check_health_error(interaction: discord.Interaction, error: app_comman
         await interaction.response.send_message(f"An error occurred: {error}", ephemeral=True)
         logging.error(f"Error in /health command: {error}")
 
-@client.tree.command(name="archive", description="Archives the current channel, making it read-only.")
+@app_commands.command(name="schedule", description="Show the background jobs and when they run next (Admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+async def show_schedule(interaction: discord.Interaction):
+    """Show the background jobs and when they run next."""
+    embed = discord.Embed(
+        title="⏱️ Background Jobs",
+        description="Next runs and how late the last run started:",
+        color=discord.Color.blue()
+    )
+    for job in client.scheduler.status():
+        next_run = f"<t:{int(job['next_run'])}:R>" if job["next_run"] else "Not started"
+        lateness = f"{job['last_lateness']:.1f}s" if job["last_lateness"] is not None else "-"
+        duration = f"{job['last_duration']:.1f}s" if job["last_duration"] is not None else "-"
+        value = (f"**Next run:** {next_run}{' (running now)' if job['running'] else ''}\n"
+                 f"**Last run:** {lateness} late, took {duration}\n"
+                 f"**Runs:** {job['runs']} | **Failed:** {job['failures']} | **Timed out:** {job['timeouts']} | **Missed:** {job['missed']}")
+        if job["last_error"]:
+            value += f"\n**Last error:** {job['last_error'][:200]}"
+        embed.add_field(name=job["name"].title(), value=value, inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@show_schedule.error
+async def show_schedule_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ Only administrators can use this command!", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ An error occurred while showing the schedule.", ephemeral=True)
+
+@app_commands.command(name="stats", description="Show how long each stage of the stock, weather and health pipelines takes (Admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+async def show_stats(interaction: discord.Interaction):
+    """Show p50/p95 timings per pipeline stage and the end-to-end stock post lateness."""
+    embed = discord.Embed(
+        title="📊 Pipeline Timings",
+        description="Recent samples per stage, in seconds:",
+        color=discord.Color.blue()
+    )
+    for pipeline, title in (("scrape", "🌐 Scraper"), ("api", "🔄 Backup API"), ("stock", "🌱 Stock"),
+                            ("discord", "💬 Discord"), ("weather", "🌦️ Weather"), ("health", "🩺 Health Check")):
+        stages = [stage for stage in timings.summary(pipeline + ".") if stage["name"] != "stock.lateness"]
+        if not stages:
+            continue
+        lines = [f"{'stage':<16}{'n':>6}{'p50':>8}{'p95':>8}{'max':>8}"]
+        for stage in stages:
+            lines.append(f"{stage['name'].split('.', 1)[1]:<16}{stage['count']:>6}"
+                         f"{stage['p50']:>8.2f}{stage['p95']:>8.2f}{stage['max']:>8.2f}")
+        embed.add_field(name=title, value="```" + "\n".join(lines) + "```", inline=False)
+
+    lateness = timings.summary("stock.lateness")
+    if lateness:
+        stage = lateness[0]
+        embed.add_field(
+            name="⏰ Stock Post Lateness",
+            value=f"From the 5-minute mark to the posted message over {stage['count']} posts:\n"
+                  f"**p50:** {stage['p50']:.1f}s | **p95:** {stage['p95']:.1f}s | **max:** {stage['max']:.1f}s",
+            inline=False
+        )
+    if not embed.fields:
+        embed.description = "No timings recorded yet."
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@show_stats.error
+async def show_stats_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ Only administrators can use this command!", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ An error occurred while showing the stats.", ephemeral=True)
+
+@app_commands.command(name="profile", description="Profile CPU or memory of the running bot (Admin only)")
+@app_commands.describe(
+    mode="What to profile",
+    seconds="How long to run the CPU profile (default: 30, max: 300)"
+)
+@app_commands.choices(mode=[
+    app_commands.Choice(name="CPU", value="cpu"),
+    app_commands.Choice(name="Memory snapshot", value="memory"),
+    app_commands.Choice(name="Stop memory tracing", value="memory_stop")
+])
+@app_commands.checks.has_permissions(administrator=True)
+async def profile(interaction: discord.Interaction, mode: str, seconds: int = 30):
+    """Profile the live bot; results go to files and a summary to the logs channel."""
+    if mode == "memory_stop":
+        profiler.stop_memory()
+        await interaction.response.send_message("✅ Memory tracing stopped.", ephemeral=True)
+        return
+
+    if mode == "cpu":
+        if profiler.cpu_running:
+            await interaction.response.send_message("❌ A CPU profile is already running.", ephemeral=True)
+            return
+        seconds = max(1, min(seconds, 300))
+        await interaction.response.send_message(f"⏱️ Profiling CPU for {seconds}s - the summary will be posted in the logs channel.", ephemeral=True)
+        report_path, summary = await profiler.profile_cpu(seconds)
+    else:
+        await interaction.response.defer(ephemeral=True)
+        report_path, summary = await profiler.snapshot_memory()
+
+    text = "\n".join(summary + [f"Full report: {report_path}"])
+    logging.info(f"Profile written to {report_path}")
+    try:
+        await client.ship_logs("```" + text[:1990] + "```")
+    except Exception as e:
+        logging.error(f"Failed to post profile summary: {e}")
+    if mode == "memory":
+        await interaction.followup.send(f"✅ Memory snapshot taken - summary posted in the logs channel ({report_path}).", ephemeral=True)
+
+@profile.error
+async def profile_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ Only administrators can use this command!", ephemeral=True)
+    else:
+        logging.error(f"Error in /profile command: {error}")
+        await client.send_log(f"Error in /profile command: {error}", "ERROR")
+        if interaction.response.is_done():
+            await interaction.followup.send("❌ Profiling failed - check the logs.", ephemeral=True)
+        else:
+            await interaction.response.send_message("❌ Profiling failed - check the logs.", ephemeral=True)
+
+@app_commands.command(name="synccommands", description="Sync the slash commands with Discord now (Admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+async def sync_commands(interaction: discord.Interaction):
+    """Force a sync of the slash commands, even if they look unchanged."""
+    await interaction.response.defer(ephemeral=True)
+    count = await client.sync_commands(force=True)
+    await interaction.followup.send(f"✅ Synced {count} slash commands. New commands can take a few minutes to show up everywhere.", ephemeral=True)
+
+@sync_commands.error
+async def sync_commands_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ Only administrators can use this command!", ephemeral=True)
+    else:
+        logging.error(f"Error in /synccommands command: {error}")
+        await client.send_log(f"Error in /synccommands command: {error}", "ERROR")
+        if interaction.response.is_done():
+            await interaction.followup.send("❌ Syncing the commands failed - check the logs.", ephemeral=True)
+        else:
+            await interaction.response.send_message("❌ Syncing the commands failed - check the logs.", ephemeral=True)
+
+@app_commands.command(name="tasks", description="Show the status of the bot's background tasks (Admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+async def show_tasks(interaction: discord.Interaction):
+    """Show the status of the bot's background tasks."""
+    status_emojis = {"running": "✅", "restarting": "🔄", "finished": "⏹️", "cancelled": "⏹️", "registered": "⏸️"}
+    embed = discord.Embed(
+        title="🧵 Background Tasks",
+        color=discord.Color.blue()
+    )
+    for task in client.supervisor.status():
+        value = f"**Status:** {task['status'].title()}\n**Restarts:** {task['restarts']}"
+        if task["started_at"]:
+            value += f"\n**Started:** <t:{int(task['started_at'])}:R>"
+        if task["last_error"]:
+            value += f"\n**Last error:** {task['last_error'][:200]}"
+        embed.add_field(
+            name=f"{status_emojis.get(task['status'], '❓')} {task['name']}",
+            value=value,
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@show_tasks.error
+async def show_tasks_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ Only administrators can use this command!", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ An error occurred while showing background tasks.", ephemeral=True)
+
+@app_commands.command(name="archive", description="Archives the current channel, making it read-only.")
 @app_commands.checks.has_permissions(administrator=True)
 async def archive(interaction: discord.Interaction):
     """
@@ -1458,7 +2183,7 @@ async def archive_error(interaction: discord.Interaction, error: app_commands.Ap
     if isinstance(error, app_commands.MissingPermissions):
         await interaction.response.send_message("You do not have permission to use this command.", ephemeral=True)
 
-@client.tree.command(name="lock", description="Locks the channel where the command is executed.")
+@app_commands.command(name="lock", description="Locks the channel where the command is executed.")
 @app_commands.checks.has_permissions(administrator=True)
 async def lock(interaction: discord.Interaction):
     """
@@ -1492,8 +2217,105 @@ async def lock_error(interaction: discord.Interaction, error: app_commands.AppCo
     if isinstance(error, app_commands.MissingPermissions):
         await interaction.response.send_message("You do not have permission to use this command.", ephemeral=True)
 
+# Multi-server stock subscription commands
+@app_commands.command(name="subscribe", description="Send stock updates to a channel in this server (Admin only)")
+@app_commands.describe(
+    channel="Channel to post stock updates in",
+    news_channel="Channel for sugar apple alerts (default: the stock channel)"
+)
+@app_commands.checks.has_permissions(manage_guild=True)
+async def subscribe(interaction: discord.Interaction, channel: discord.TextChannel, news_channel: discord.TextChannel = None):
+    """Subscribe this server to stock updates."""
+    home_guild_id = client.home_guild_id()
+    if home_guild_id is None:
+        # Until the stock channel is cached the home server cannot be told apart from the others
+        await interaction.response.send_message("❌ The bot is still starting up - please try again in a minute.",
+                                                ephemeral=True)
+        return
+    if interaction.guild.id == home_guild_id:
+        await interaction.response.send_message(
+            f"❌ This is the bot's home server - stock updates are already posted in <#{STOCK_CHANNEL_ID}>.",
+            ephemeral=True
+        )
+        return
+    try:
+        settings = guild_configs.subscribe(
+            interaction.guild.id,
+            channel.id,
+            news_channel.id if news_channel else None
+        )
+        roles_text = ", ".join(f"{emoji} <@&{role_id}>" for emoji, role_id in settings.get("roles", {}).items())
+        embed = discord.Embed(
+            title="✅ Subscribed to Stock Updates",
+            description=f"Stock updates will be posted in {channel.mention} every 5 minutes.\n"
+                       f"**Alert roles:** {roles_text or 'None yet - use `/alertrole` to set them up'}",
+            color=discord.Color.green()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await client.send_log(f"Server {interaction.guild.name} subscribed to stock updates in #{channel.name} by {interaction.user.name}", "INFO")
+    except Exception as e:
+        error_msg = f"Error in /subscribe command: {str(e)}"
+        logging.error(error_msg, exc_info=True)
+        await interaction.response.send_message("❌ An error occurred while subscribing this server.", ephemeral=True)
+        await client.send_log(error_msg, "ERROR")
+
+@subscribe.error
+async def subscribe_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ You need 'Manage Server' permission to use this command!", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ An error occurred with the subscribe command.", ephemeral=True)
+
+@app_commands.command(name="unsubscribe", description="Stop sending stock updates to this server (Admin only)")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def unsubscribe(interaction: discord.Interaction):
+    """Unsubscribe this server from stock updates."""
+    if guild_configs.unsubscribe(interaction.guild.id):
+        await interaction.response.send_message("✅ This server will no longer receive stock updates.", ephemeral=True)
+        await client.send_log(f"Server {interaction.guild.name} unsubscribed from stock updates by {interaction.user.name}", "INFO")
+    else:
+        await interaction.response.send_message("❌ This server isn't subscribed to stock updates.", ephemeral=True)
+
+@unsubscribe.error
+async def unsubscribe_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ You need 'Manage Server' permission to use this command!", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ An error occurred with the unsubscribe command.", ephemeral=True)
+
+@app_commands.command(name="alertrole", description="Set the role pinged for an alert type in this server (Admin only)")
+@app_commands.describe(
+    alert="Which alert type to configure",
+    role="Role to ping (leave empty to turn the alert off)"
+)
+@app_commands.choices(alert=[
+    app_commands.Choice(name="Mythical Seeds", value="🦄"),
+    app_commands.Choice(name="Legendary Seeds", value="🌟"),
+    app_commands.Choice(name="Rare Seeds", value="🔥"),
+    app_commands.Choice(name="Gear", value="🧰"),
+    app_commands.Choice(name="Eggs", value="🥚")
+])
+@app_commands.checks.has_permissions(manage_guild=True)
+async def alert_role(interaction: discord.Interaction, alert: str, role: discord.Role = None):
+    """Set the role pinged for an alert type in this server."""
+    if not guild_configs.get(interaction.guild.id):
+        await interaction.response.send_message("❌ Use `/subscribe` to set up stock updates for this server first!", ephemeral=True)
+        return
+    guild_configs.set_role(interaction.guild.id, alert, role.id if role else None)
+    if role:
+        await interaction.response.send_message(f"✅ {alert} alerts will ping {role.mention}.", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"✅ {alert} alerts are turned off for this server.", ephemeral=True)
+
+@alert_role.error
+async def alert_role_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("❌ You need 'Manage Server' permission to use this command!", ephemeral=True)
+    else:
+        await interaction.response.send_message("❌ An error occurred with the alert role command.", ephemeral=True)
+
 # Invite Challenge Commands
-@client.tree.command(name="invite", description="Invite challenge commands")
+@app_commands.command(name="invite", description="Invite challenge commands")
 @app_commands.describe(
     action="What to do with the invite challenge",
     duration="Duration in days (default: 7)",
@@ -1673,7 +2495,7 @@ async def invite_challenge_error(interaction: discord.Interaction, error: app_co
     else:
         await interaction.response.send_message("❌ An error occurred with the invite challenge command.", ephemeral=True)
 
-@client.tree.command(name="joinchallenge", description="Join the current invite challenge")
+@app_commands.command(name="joinchallenge", description="Join the current invite challenge")
 async def join_challenge(interaction: discord.Interaction):
     """Join the current invite challenge."""
     try:
@@ -1723,7 +2545,7 @@ async def join_challenge(interaction: discord.Interaction):
         await interaction.response.send_message("❌ An error occurred while joining the challenge.", ephemeral=True)
         await client.send_log(error_msg, "ERROR")
 
-@client.tree.command(name="leaderboard", description="Show the current invite challenge leaderboard")
+@app_commands.command(name="leaderboard", description="Show the current invite challenge leaderboard")
 async def show_leaderboard(interaction: discord.Interaction):
     """Show the current invite challenge leaderboard."""
     try:
@@ -1750,7 +2572,7 @@ async def show_leaderboard(interaction: discord.Interaction):
         await interaction.response.send_message("❌ An error occurred while showing the leaderboard.", ephemeral=True)
         await client.send_log(error_msg, "ERROR")
 
-@client.tree.command(name="refreshinvites", description="Manually refresh invite counts for all participants (Admin only)")
+@app_commands.command(name="refreshinvites", description="Manually refresh invite counts for all participants (Admin only)")
 @app_commands.checks.has_permissions(manage_guild=True)
 async def refresh_invites(interaction: discord.Interaction):
     """Manually refresh invite counts for all participants."""
@@ -1768,28 +2590,25 @@ async def refresh_invites(interaction: discord.Interaction):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        # Refresh invite counts for all participants
-        updated_count = 0
-        for user_id in active_challenge["participants"]:
-            try:
-                current_invites = await invite_challenge.get_user_invite_count(interaction.guild, int(user_id))
-                invite_challenge.update_participant_invites(active_challenge["id"], int(user_id), current_invites)
-                updated_count += 1
-            except Exception as e:
-                logging.error(f"Error refreshing invites for user {user_id}: {e}")
+        # Refresh invite counts for all participants (one invite fetch, one save)
+        await interaction.response.defer(ephemeral=True)
+        updated_count = await invite_challenge.recount(interaction.guild)
         
         embed = discord.Embed(
             title="✅ Invite Counts Refreshed",
             description=f"Successfully refreshed invite counts for {updated_count} participants!",
             color=discord.Color.green()
         )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
         await client.send_log(f"Invite counts refreshed for {updated_count} participants by {interaction.user.name}", "INFO")
         
     except Exception as e:
         error_msg = f"Error refreshing invite counts: {str(e)}"
         logging.error(error_msg, exc_info=True)
-        await interaction.response.send_message("❌ An error occurred while refreshing invite counts.", ephemeral=True)
+        if interaction.response.is_done():
+            await interaction.followup.send("❌ An error occurred while refreshing invite counts.", ephemeral=True)
+        else:
+            await interaction.response.send_message("❌ An error occurred while refreshing invite counts.", ephemeral=True)
         await client.send_log(error_msg, "ERROR")
 
 @refresh_invites.error
@@ -1799,7 +2618,7 @@ async def refresh_invites_error(interaction: discord.Interaction, error: app_com
     else:
         await interaction.response.send_message("❌ An error occurred with the refresh command.", ephemeral=True)
 
-@client.tree.command(name="myinvites", description="Check your current invite count")
+@app_commands.command(name="myinvites", description="Check your current invite count")
 async def check_my_invites(interaction: discord.Interaction):
     """Check your current invite count."""
     try:
@@ -1831,7 +2650,7 @@ async def check_my_invites(interaction: discord.Interaction):
         logging.error(error_msg, exc_info=True)
         await interaction.response.send_message("❌ An error occurred while checking your invite count.", ephemeral=True)
 
-@client.tree.command(name="setinvites", description="Set someone's invite count for the active challenge (Admin only)")
+@app_commands.command(name="setinvites", description="Set someone's invite count for the active challenge (Admin only)")
 @app_commands.describe(
     user="The user whose invite count to update",
     count="The new invite count to set"
@@ -1885,7 +2704,7 @@ async def set_invites_error(interaction: discord.Interaction, error: app_command
     else:
         await interaction.response.send_message("❌ An error occurred with the set invites command.", ephemeral=True)
 
-@client.tree.command(name="addinvites", description="Add invites to someone's count for the active challenge (Admin only)")
+@app_commands.command(name="addinvites", description="Add invites to someone's count for the active challenge (Admin only)")
 @app_commands.describe(
     user="The user whose invite count to add to",
     count="The number of invites to add"
@@ -1944,8 +2763,40 @@ async def add_invites_error(interaction: discord.Interaction, error: app_command
     else:
         await interaction.response.send_message("❌ An error occurred with the add invites command.", ephemeral=True)
 
+# Everything create_client() registers on a new client
+COMMANDS = [
+    hi, send_update, purge, switch_source, send_test, check_health, show_schedule,
+    show_stats, profile, sync_commands, show_tasks, archive, lock, subscribe,
+    unsubscribe, alert_role, invite_challenge_cmd, join_challenge, show_leaderboard, refresh_invites,
+    check_my_invites, set_invites, add_invites, calc_group
+]
+EVENT_HANDLERS = [
+    on_member_update, on_uncached_member_update, on_member_join, on_raw_member_remove,
+    on_raw_reaction_add, on_raw_reaction_remove, on_guild_role_update, on_guild_role_delete,
+    on_raw_message_delete, on_raw_bulk_message_delete
+]
+
+def create_client() -> MyClient:
+    """
+    Build the bot: the client with its scheduler, state and background tasks,
+    plus every slash command and event handler. Importing this module has no
+    side effects; nothing connects to Discord until the client is started.
+    Process-wide registrations (the metrics collector, the 429 counter on the
+    discord logger) replace or reuse the previous ones, so building the client
+    twice leaves the same state as building it once.
+    """
+    global client
+    client = MyClient()
+    for command in COMMANDS:
+        client.tree.add_command(command)
+    for handler in EVENT_HANDLERS:
+        client.event(handler)
+    return client
+
 async def main():
     global client
+    setup_logging(LOG_LEVEL, LOG_LEVELS)
+    client = create_client()
     try:
         await client.start(TOKEN)
     except Exception as e:
@@ -1953,4 +2804,5 @@ async def main():
         await client.send_log(f"Error in main function: {e}", "ERROR")
         await asyncio.sleep(60)  # Wait before retrying
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
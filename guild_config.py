@@ -0,0 +1,84 @@
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+class GuildConfigStore:
+    """
+    Per-server settings for servers that subscribe to stock updates.
+
+    The bot's home server is still configured through config.py; this store
+    only holds the additional servers. Each entry looks like:
+        {"stock_channel_id": int, "news_channel_id": int | None,
+         "roles": {emoji: role_id}, "digest": bool (optional), "live_board": bool (optional)}
+    """
+
+    def __init__(self, data_file: str = 'guild_config.json'):
+        self.data_file = data_file
+        self._guilds = None  # Loaded from data_file on first use
+
+    @property
+    def guilds(self) -> Dict:
+        if self._guilds is None:
+            self._guilds = self.load_guilds()
+        return self._guilds
+
+    @guilds.setter
+    def guilds(self, value: Dict):
+        self._guilds = value
+
+    def load_guilds(self) -> Dict:
+        """Load server settings from file."""
+        try:
+            with open(self.data_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"Error loading guild config: {e}")
+            return {}
+
+    def save_guilds(self):
+        """Save server settings to file."""
+        try:
+            with open(self.data_file, 'w') as f:
+                json.dump(self.guilds, f, indent=2)
+        except Exception as e:
+            logging.error(f"Error saving guild config: {e}")
+
+    def get(self, guild_id: int) -> Optional[Dict]:
+        """Get the settings for a server, if it is subscribed."""
+        return self.guilds.get(str(guild_id))
+
+    def subscribed(self) -> List[Tuple[int, Dict]]:
+        """All subscribed servers as (guild_id, settings) pairs."""
+        return [(int(guild_id), settings) for guild_id, settings in self.guilds.items()
+                if settings.get("stock_channel_id")]
+
+    def subscribe(self, guild_id: int, stock_channel_id: int, news_channel_id: Optional[int] = None) -> Dict:
+        """Subscribe a server to stock updates, keeping any roles it already set up."""
+        settings = self.guilds.setdefault(str(guild_id), {"roles": {}})
+        settings["stock_channel_id"] = stock_channel_id
+        settings["news_channel_id"] = news_channel_id
+        self.save_guilds()
+        return settings
+
+    def unsubscribe(self, guild_id: int) -> bool:
+        """Stop sending stock updates to a server. Returns False if it wasn't subscribed."""
+        if str(guild_id) not in self.guilds:
+            return False
+        del self.guilds[str(guild_id)]
+        self.save_guilds()
+        return True
+
+    def set_role(self, guild_id: int, emoji: str, role_id: Optional[int]):
+        """Set (or clear, with None) the role pinged for an alert type in a server."""
+        settings = self.guilds.setdefault(str(guild_id), {"roles": {}})
+        roles = settings.setdefault("roles", {})
+        if role_id:
+            roles[emoji] = role_id
+        else:
+            roles.pop(emoji, None)
+        self.save_guilds()
+
+# Global instance
+guild_configs = GuildConfigStore()
@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import json
 import time
@@ -8,7 +9,25 @@ import logging
 class InviteChallenge:
     def __init__(self, data_file: str = 'invite_challenge.json'):
         self.data_file = data_file
-        self.challenges = self.load_challenges()
+        self._challenges = None  # Loaded from data_file on first use
+        self.recount_window = 10  # Seconds of joins gathered into one invite recount
+        self._recounts: Dict[int, Dict] = {}  # guild ID -> {"guild", "members": new member IDs}
+        self._recount_wakeup = asyncio.Event()
+        self.recount_metrics = {
+            "requests": 0,
+            "recounts": 0,
+            "failures": 0
+        }
+
+    @property
+    def challenges(self) -> Dict:
+        if self._challenges is None:
+            self._challenges = self.load_challenges()
+        return self._challenges
+
+    @challenges.setter
+    def challenges(self, value: Dict):
+        self._challenges = value
         
     def load_challenges(self) -> Dict:
         """Load challenge data from file."""
@@ -128,6 +147,76 @@ class InviteChallenge:
             logging.error(f"Error getting invite count for user {user_id}: {e}")
             return 0
     
+    async def get_invite_counts(self, guild) -> Dict[int, int]:
+        """Invite uses per inviter, from a single fetch of the guild's invites."""
+        counts: Dict[int, int] = {}
+        for inv in await guild.invites():
+            if inv.inviter:
+                counts[inv.inviter.id] = counts.get(inv.inviter.id, 0) + inv.uses
+        return counts
+
+    async def recount(self, guild, new_member_ids=()) -> int:
+        """
+        Refresh the invite counts of everyone in the guild's active challenge
+        (auto-joining `new_member_ids` first) with one invite fetch and one
+        save. Returns the number of participants updated.
+        """
+        challenge = self.get_active_challenge(guild.id)
+        if not challenge:
+            return 0
+
+        # New members join the challenge even if the invite fetch below fails
+        now = int(time.time())
+        participants = challenge["participants"]
+        joined = [member_id for member_id in new_member_ids if str(member_id) not in participants]
+        for member_id in joined:
+            participants[str(member_id)] = {"joined_time": now, "current_invites": 0}
+
+        try:
+            counts = await self.get_invite_counts(guild)
+        except Exception as e:
+            # Keep the previous counts rather than resetting everyone to 0
+            self.recount_metrics["failures"] += 1
+            logging.error(f"Error fetching invites for challenge {challenge['id']}: {e}")
+            if joined:
+                self.save_challenges()
+            return 0
+
+        for user_id, data in participants.items():
+            data["current_invites"] = counts.get(int(user_id), 0)
+        self.save_challenges()
+        self.recount_metrics["recounts"] += 1
+        logging.info(f"Recounted invites for {len(participants)} participants of challenge {challenge['id']}"
+                     + (f" ({len(new_member_ids)} new members joined)" if new_member_ids else ""))
+        return len(participants)
+
+    def request_recount(self, guild, new_member_id: Optional[int] = None):
+        """
+        Ask for a recount of the guild's active challenge. Requests within
+        `recount_window` seconds are combined, so a burst of joins costs one
+        invite fetch and one save.
+        """
+        pending = self._recounts.setdefault(guild.id, {"guild": guild, "members": set()})
+        if new_member_id is not None:
+            pending["members"].add(new_member_id)
+        self.recount_metrics["requests"] += 1
+        self._recount_wakeup.set()
+
+    async def run_recounts(self):
+        """Recount loop: waits for a request, lets the window pass, then recounts each guild once."""
+        while True:
+            await self._recount_wakeup.wait()
+            await asyncio.sleep(self.recount_window)
+            self._recount_wakeup.clear()
+            pending, self._recounts = self._recounts, {}
+            for item in pending.values():
+                try:
+                    await self.recount(item["guild"], item["members"])
+                except Exception as e:
+                    # One failing guild must not cost the others their recount
+                    self.recount_metrics["failures"] += 1
+                    logging.error(f"Invite recount for guild {item['guild'].id} failed: {e}", exc_info=True)
+
     def format_time_remaining(self, end_time: int) -> str:
         """Format the time remaining in a human-readable format."""
         remaining = end_time - int(time.time())
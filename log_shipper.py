@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict
+
+# Discord messages are capped at 2000 characters, leave room for the code block fences
+MAX_MESSAGE_CHARS = 1990
+
+class LogShipper:
+    """
+    Buffers log lines bound for the Discord logs channel and ships them in batches.
+
+    Identical lines submitted between two flushes are collapsed into one entry
+    with an "xN" count, and each flush sends a single code-block message. A flush
+    happens every flush_interval seconds, or sooner once max_entries distinct
+    lines are waiting.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[None]], flush_interval: float = 10,
+                 max_entries: int = 20, max_buffer: int = 500):
+        self.send = send
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.max_buffer = max_buffer
+        self.buffer = OrderedDict()  # (level, content) -> {"timestamp": str, "count": int}
+        self.metrics = {
+            "submitted": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "flushed_entries": 0,
+            "flushed_messages": 0,
+            "send_failures": 0
+        }
+        self._wakeup = asyncio.Event()
+
+    def submit(self, content: str, level: str, timestamp: str) -> bool:
+        """Queue a log line. Returns False if the buffer is full and the line was dropped."""
+        self.metrics["submitted"] += 1
+        key = (level, content)
+        entry = self.buffer.get(key)
+        if entry:
+            entry["count"] += 1
+            self.metrics["coalesced"] += 1
+            return True
+
+        if len(self.buffer) >= self.max_buffer:
+            self.metrics["dropped"] += 1
+            return False
+
+        self.buffer[key] = {"timestamp": timestamp, "count": 1}
+        if len(self.buffer) >= self.max_entries:
+            self._wakeup.set()
+        return True
+
+    def _take_batch(self) -> list:
+        """Pop as many buffered entries as fit in one message."""
+        lines = []
+        size = len("``````")
+        while self.buffer:
+            (level, content), entry = next(iter(self.buffer.items()))
+            line = f"[{entry['timestamp']}] [{level}] {content}"
+            if entry["count"] > 1:
+                line += f" (x{entry['count']})"
+            if lines and size + len(line) + 1 > MAX_MESSAGE_CHARS:
+                break
+            # A single oversized line is truncated rather than blocking the queue
+            line = line[:MAX_MESSAGE_CHARS - size - 1]
+            lines.append(line)
+            size += len(line) + 1
+            self.buffer.popitem(last=False)
+        return lines
+
+    async def flush(self):
+        """Send everything currently buffered, one code-block message at a time."""
+        while self.buffer:
+            lines = self._take_batch()
+            try:
+                await self.send("```" + "\n".join(lines) + "```")
+                self.metrics["flushed_entries"] += len(lines)
+                self.metrics["flushed_messages"] += 1
+            except Exception as e:
+                self.metrics["send_failures"] += 1
+                self.metrics["dropped"] += len(lines)
+                logging.error(f"Failed to ship {len(lines)} log lines to Discord: {e}")
+
+    async def run(self):
+        """Flush loop: wakes up on the interval or when the size threshold is hit."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Error in log shipper: {e}")
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return a copy of the shipper counters plus the current buffer size."""
+        metrics = dict(self.metrics)
+        metrics["buffered"] = len(self.buffer)
+        return metrics
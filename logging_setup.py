@@ -0,0 +1,110 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Dict, Optional, Union
+
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(message)s'
+DATE_FORMAT = '%H:%M:%S'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_throttles: Dict[str, Dict] = {}
+
+def _to_level(level: Union[int, str]) -> int:
+    return level if isinstance(level, int) else logging.getLevelName(level.upper())
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Applies per-module log levels. A record matches a logger name (or any of
+    its parents, so "discord" covers "discord.gateway") or, for the many
+    plain logging.info() calls, the name of the source file it came from.
+    """
+
+    def __init__(self, default: int, levels: Dict[str, int]):
+        super().__init__()
+        self.default = default
+        self.levels = levels
+
+    def level_for(self, record: logging.LogRecord) -> int:
+        name = record.name
+        while name:
+            if name in self.levels:
+                return self.levels[name]
+            name = name.rpartition('.')[0]
+        return self.levels.get(record.module, self.default)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.level_for(record)
+
+class SnapshotQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues a copy of the record with only its message resolved. The stock
+    QueueHandler formats the record (tracebacks included) on the calling
+    thread; here that is left to the listener's handler.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()  # The args may change or not be thread-safe later
+        record.args = None
+        return record
+
+def setup_logging(level: Union[int, str] = logging.INFO, module_levels: Optional[Dict[str, Union[int, str]]] = None):
+    """
+    Configure logging for the whole bot. Call once at startup; calling again
+    replaces the previous setup.
+
+    Log calls only resolve the message and put the record on a queue; a
+    listener thread formats it (tracebacks included) and writes it to stderr,
+    so formatting and slow console or disk I/O never block the event loop. module_levels maps module or logger names to their own level,
+    e.g. {"scraper": "WARNING", "discord": "INFO"}.
+    """
+    global _listener
+    stop_logging()
+
+    default = _to_level(level)
+    levels = {name: _to_level(module_level) for name, module_level in (module_levels or {}).items()}
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = SnapshotQueueHandler(log_queue)
+    queue_handler.addFilter(ModuleLevelFilter(default, levels))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # The root level lets through anything a module is allowed to log; the filter does the rest
+    root.setLevel(min([default, *levels.values()]))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def stop_logging():
+    """Stop the listener thread after it has written every queued record."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
+
+def log_throttled(key: str, message: str, interval: float = 300, level: int = logging.INFO):
+    """
+    Log a message from a hot path at most once per `interval` seconds per key.
+    The next line that gets through says how many were skipped in between.
+    """
+    now = time.monotonic()
+    throttle = _throttles.setdefault(key, {"last": None, "skipped": 0})
+    if throttle["last"] is not None and now - throttle["last"] < interval:
+        throttle["skipped"] += 1
+        return
+    if throttle["skipped"]:
+        message = f"{message} ({throttle['skipped']} similar skipped)"
+    throttle["last"] = now
+    throttle["skipped"] = 0
+    logging.log(level, message, stacklevel=2)
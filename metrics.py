@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import resource
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# A collector returns metric families as (name, type, help, [(labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class MetricsRegistry:
+    """
+    Counters owned by the registry plus collectors that read everything else
+    (timings, scheduler, supervisor, ...) at scrape time, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict] = {}  # name -> {"help": str, "values": {labels tuple: value}}
+        self.collectors: Dict[str, Callable[[], Iterable[Family]]] = {}  # name -> collector
+
+    def counter(self, name: str, help_text: str):
+        """Declare a counter so it is exported (as 0) before the first increment."""
+        self.counters.setdefault(name, {"help": help_text, "values": {}})
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter, declaring it on first use."""
+        counter = self.counters.setdefault(name, {"help": name, "values": {}})
+        key = tuple(sorted(labels.items()))
+        counter["values"][key] = counter["values"].get(key, 0) + value
+
+    def value(self, name: str, **labels) -> float:
+        """Current value of a counter (0 if it was never incremented)."""
+        counter = self.counters.get(name)
+        return counter["values"].get(tuple(sorted(labels.items())), 0) if counter else 0
+
+    def add_collector(self, name: str, collector: Callable[[], Iterable[Family]]):
+        """Register a collector; registering the same name again replaces the old one."""
+        self.collectors[name] = collector
+
+    def remove_collector(self, name: str, collector: Optional[Callable[[], Iterable[Family]]] = None):
+        """Drop a collector (only if it is still `collector`, when given)."""
+        if collector is None or self.collectors.get(name) == collector:
+            self.collectors.pop(name, None)
+
+    def families(self) -> List[Family]:
+        families = [(name, "counter", counter["help"], [(dict(key), value) for key, value in counter["values"].items()])
+                    for name, counter in self.counters.items()]
+        for name, collector in list(self.collectors.items()):
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logging.error(f"Metrics collector {name} failed: {e}")
+        return families
+
+    def render(self) -> str:
+        lines = []
+        for name, kind, help_text, samples in self.families():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                sample_name = labels.pop("__name__", name)
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def timing_families(timings, name: str = "gagbot_stage_seconds") -> List[Family]:
+    """Export timing histograms as a Prometheus summary (p50/p95 over recent samples, sum, count)."""
+    samples = []
+    for stage, histogram in sorted(timings.histograms.items()):
+        for quantile in (0.5, 0.95):
+            samples.append(({"stage": stage, "quantile": str(quantile)}, histogram.percentile(quantile * 100)))
+        samples.append(({"__name__": f"{name}_sum", "stage": stage}, histogram.total))
+        samples.append(({"__name__": f"{name}_count", "stage": stage}, histogram.count))
+    return [(name, "summary", "Duration of each pipeline stage in seconds", samples)]
+
+def process_rss_bytes() -> float:
+    """Resident set size of this process (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak * 1024 if os.uname().sysname != "Darwin" else peak
+
+class RateLimitCounter(logging.Handler):
+    """
+    Counts the 429 responses discord.py logs while it waits out a rate limit.
+
+    discord.py logs one "responded with 429" warning per 429 (a global limit
+    adds a second "Global rate limit has been hit" line), and webhooks log one
+    "is rate limited" line, so only those are counted.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        super().__init__(level=logging.WARNING)
+        self.registry = registry
+        registry.counter("gagbot_discord_rate_limited_total", "Discord 429 responses seen by the bot")
+
+    @classmethod
+    def attach(cls, registry: MetricsRegistry, logger_name: str = "discord") -> "RateLimitCounter":
+        """Add a counter to the logger unless one for this registry is already there."""
+        logger = logging.getLogger(logger_name)
+        for handler in logger.handlers:
+            if isinstance(handler, cls) and handler.registry is registry:
+                return handler
+        handler = cls(registry)
+        logger.addHandler(handler)
+        return handler
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if record.name.startswith("discord.webhook"):
+            if "is rate limited" in message:
+                self.registry.inc("gagbot_discord_rate_limited_total", scope="webhook")
+        elif "responded with 429" in message:
+            self.registry.inc("gagbot_discord_rate_limited_total", scope="bot")
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a short sleep."""
+
+    def __init__(self, interval: float = 1, observe: Optional[Callable[[float], None]] = None):
+        self.interval = interval
+        self.observe = observe
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if self.observe:
+                self.observe(lag)
+
+class MetricsServer:
+    """Serves the registry on http://host:port/metrics."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+
+    async def handle_metrics(self, request):
+        from aiohttp import web
+        started = time.perf_counter()
+        body = self.registry.render()
+        body += f"# TYPE gagbot_metrics_render_seconds gauge\ngagbot_metrics_render_seconds {time.perf_counter() - started!r}\n"
+        return web.Response(text=body, content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def run(self):
+        """Serve until cancelled."""
+        from aiohttp import web  # The web server is only loaded when metrics are turned on
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+            logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+# Global instance
+metrics = MetricsRegistry()
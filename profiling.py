@@ -0,0 +1,129 @@
+import asyncio
+import cProfile
+import io
+import linecache
+import logging
+import os
+import pstats
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+class Profiler:
+    """
+    On-demand CPU and memory profiling of the running bot.
+
+    profile_cpu() runs cProfile on the event loop thread (where all of the bot's
+    work happens) for a number of seconds. snapshot_memory() takes a tracemalloc
+    snapshot and, from the second call on, diffs it against the previous one.
+    Raw results (.prof / .snap) and readable reports (.txt) are written to
+    `output_dir`; every call returns the report path and a short summary.
+    """
+
+    def __init__(self, output_dir: str = 'profiles', frames: int = 10):
+        self.output_dir = output_dir
+        self.frames = frames  # Stack depth kept by tracemalloc for each allocation
+        self.last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._cpu_lock = asyncio.Lock()
+
+    def _path(self, kind: str, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.output_dir, f"{kind}-{stamp}.{extension}")
+
+    @property
+    def cpu_running(self) -> bool:
+        return self._cpu_lock.locked()
+
+    async def profile_cpu(self, seconds: float, top: int = 10) -> Tuple[str, List[str]]:
+        """Profile the event loop for `seconds`. Raises RuntimeError if a profile is already running."""
+        if self._cpu_lock.locked():
+            raise RuntimeError("A CPU profile is already running")
+        async with self._cpu_lock:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+            return await asyncio.to_thread(self._write_cpu_report, profile, seconds, top)
+
+    def _write_cpu_report(self, profile: cProfile.Profile, seconds: float, top: int) -> Tuple[str, List[str]]:
+        profile.dump_stats(self._path("cpu", "prof"))
+        report_path = self._path("cpu", "txt")
+        text = io.StringIO()
+        stats = pstats.Stats(profile, stream=text)
+        stats.sort_stats("tottime").print_stats(40)
+        stats.sort_stats("cumulative").print_stats(40)
+        with open(report_path, 'w') as f:
+            f.write(text.getvalue())
+
+        # Top functions by time spent in the function itself
+        summary = [f"CPU profile over {seconds:g}s - top functions by own time:"]
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        for (filename, line, name), (calls, _, own_time, cumulative, _) in entries:
+            location = f"{os.path.basename(filename)}:{line}" if line else filename
+            summary.append(f"{own_time:8.3f}s own {cumulative:8.3f}s cum {calls:>7} calls  {name} ({location})")
+        return report_path, summary
+
+    @property
+    def memory_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    async def snapshot_memory(self, top: int = 10) -> Tuple[str, List[str]]:
+        """
+        Take a memory snapshot. The first call starts tracemalloc, so only
+        allocations made after it are tracked; later calls are diffed against
+        the previous snapshot to show what grew.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logging.info(f"Started tracemalloc with {self.frames} frames")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),  # Reading source lines for the reports
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        previous, self.last_snapshot = self.last_snapshot, snapshot
+        return await asyncio.to_thread(self._write_memory_report, snapshot, previous, top)
+
+    def _write_memory_report(self, snapshot: tracemalloc.Snapshot, previous: Optional[tracemalloc.Snapshot],
+                             top: int) -> Tuple[str, List[str]]:
+        snapshot.dump(self._path("mem", "snap"))
+        report_path = self._path("mem", "txt")
+        current, peak = tracemalloc.get_traced_memory()
+        summary = [f"Traced memory: {current / 1024 / 1024:.1f} MiB (peak {peak / 1024 / 1024:.1f} MiB)"]
+
+        if previous is None:
+            summary.append("Top allocation sites (first snapshot, next call shows the growth):")
+            stats = snapshot.statistics("lineno")
+            lines = [self._format_stat(stat.traceback, stat.size, stat.count) for stat in stats[:top]]
+        else:
+            summary.append("Top growth since the previous snapshot:")
+            stats = snapshot.compare_to(previous, "lineno")
+            lines = [self._format_stat(stat.traceback, stat.size_diff, stat.count_diff, diff=True) for stat in stats[:top]]
+        summary.extend(lines)
+
+        with open(report_path, 'w') as f:
+            f.write("\n".join(summary) + "\n\nFull tracebacks of the top sites:\n")
+            for stat in snapshot.statistics("traceback")[:top]:
+                f.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+        return report_path, summary
+
+    @staticmethod
+    def _format_stat(traceback, size: int, count: int, diff: bool = False) -> str:
+        frame = traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip()[:60]
+        sign = "+" if diff and size >= 0 else ""
+        return f"{sign}{size / 1024:9.1f} KiB {sign}{count:>7} blocks  {os.path.basename(frame.filename)}:{frame.lineno}  {source}"
+
+    def stop_memory(self):
+        """Stop tracemalloc (it slows allocations down while it runs) and forget the last snapshot."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.last_snapshot = None
+
+# Global instance
+profiler = Profiler()
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import discord
+from alert_master import AlertMaster
+
+class ReactionRoles:
+    """
+    Applies role-message reactions with as few API calls as possible.
+
+    The emoji -> role mapping and the permission checks (Manage Roles, role
+    below the bot's top role) are worked out once per server and reused until
+    invalidate() is called. Reactions are collected per user for `debounce`
+    seconds after their last one, so a burst of toggles ends in a single
+    member.edit(roles=...) that also sets the Alert Master role. Nothing is
+    sent when the toggles cancel out. member.edit(roles=...) overwrites the
+    whole role list, so it is built from the gateway-updated member cache, or
+    from a member fetched right before the edit when the member is not cached;
+    a member object captured earlier could undo a change made since.
+    """
+
+    def __init__(self, emoji_roles: Dict[str, int], alert_master: AlertMaster,
+                 debounce: float = 1.5, clock: Callable[[], float] = time.monotonic):
+        self.emoji_roles = emoji_roles
+        self.alert_master = alert_master
+        self.debounce = debounce
+        self.clock = clock
+        self.assignable: Optional[Dict[int, discord.Role]] = None  # role ID -> role the bot may manage
+        self.pending: Dict[int, Dict[int, bool]] = {}  # user ID -> {role ID: should have it}
+        self.deadlines: Dict[int, float] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.metrics = {
+            "reactions": 0,
+            "edits": 0,
+            "unchanged": 0,
+            "failures": 0
+        }
+
+    def invalidate(self):
+        """Forget the precomputed role checks (roles or the bot's permissions changed)."""
+        self.assignable = None
+
+    def refresh(self, guild: discord.Guild):
+        """Work out which mapped roles the bot is allowed to assign in this server."""
+        self.assignable = {}
+        me = guild.me
+        if me is None or not me.guild_permissions.manage_roles:
+            logging.error("Bot does not have 'Manage Roles' permission")
+            return
+        for role_id in set(self.emoji_roles.values()) | {self.alert_master.role_id}:
+            role = guild.get_role(role_id)
+            if role is None:
+                logging.error(f"Role with ID {role_id} not found in the server")
+            elif me.top_role.position <= role.position:
+                logging.error(f"Bot's role ({me.top_role.name}) must be higher than the role it's trying to assign ({role.name})")
+            else:
+                self.assignable[role_id] = role
+
+    def toggle(self, guild: discord.Guild, user_id: int, emoji: str, add: bool) -> bool:
+        """Queue a role change for a reaction. Returns False if the emoji is not a role emoji."""
+        role_id = self.emoji_roles.get(emoji)
+        if role_id is None:
+            return False
+        self.metrics["reactions"] += 1
+        self.pending.setdefault(user_id, {})[role_id] = add
+        self.deadlines[user_id] = self.clock() + self.debounce
+        if user_id not in self.tasks:
+            self.tasks[user_id] = asyncio.create_task(self._run(guild, user_id), name=f"reaction-roles:{user_id}")
+        return True
+
+    async def _run(self, guild: discord.Guild, user_id: int):
+        """Apply one user's toggles once they stop reacting; toggles made meanwhile get another round."""
+        try:
+            while user_id in self.pending:
+                while (delay := self.deadlines[user_id] - self.clock()) > 0:
+                    await asyncio.sleep(delay)
+                toggles = self.pending.pop(user_id)
+                await self._apply(guild, user_id, toggles)
+        finally:
+            self.tasks.pop(user_id, None)
+            self.deadlines.pop(user_id, None)
+
+    async def _apply(self, guild: discord.Guild, user_id: int, toggles: Dict[int, bool]):
+        try:
+            await self.edit(await self.current_member(guild, user_id), toggles, "Reaction roles")
+        except discord.NotFound:
+            logging.warning(f"Member with ID {user_id} not found in the server")
+        except discord.Forbidden as e:
+            self.metrics["failures"] += 1
+            self.invalidate()
+            logging.error(f"Permission error when updating reaction roles: {e}")
+        except Exception as e:
+            self.metrics["failures"] += 1
+            logging.error(f"Failed to update reaction roles for {user_id}: {e}", exc_info=True)
+
+    @staticmethod
+    async def current_member(guild: discord.Guild, member_id: int) -> discord.Member:
+        """The member with their current roles: from the member cache, else fetched now."""
+        return guild.get_member(member_id) or await guild.fetch_member(member_id)
+
+    async def edit(self, member: discord.Member, changes: Dict[int, bool], reason: str) -> Tuple[List[str], List[str]]:
+        """
+        Apply {role ID: should have it} to a member (plus the Alert Master role)
+        in one member.edit. Roles the bot may not assign are left alone.
+        `member` must come from current_member(), since its roles are written back.
+        Returns the names of the roles added and removed.
+        """
+        if self.assignable is None:
+            self.refresh(member.guild)
+        current = {role.id for role in member.roles if not role.is_default()}
+        desired = set(current)
+        for role_id, add in changes.items():
+            if role_id not in self.assignable:
+                continue
+            if add:
+                desired.add(role_id)
+            else:
+                desired.discard(role_id)
+        if self.alert_master.role_id in self.assignable and not member.bot:
+            self.alert_master.settle(desired)
+
+        if desired == current:
+            self.metrics["unchanged"] += 1
+            return [], []
+        roles = [role for role in member.roles if role.id in desired and not role.is_default()]
+        roles += [self.assignable[role_id] for role_id in desired - current]
+        self.alert_master.expect(member.id, desired)
+        try:
+            await member.edit(roles=roles, reason=reason)
+        except Exception:
+            self.alert_master.in_flight.pop(member.id, None)
+            raise
+        self.metrics["edits"] += 1
+        added = [self.assignable[role_id].name for role_id in desired - current]
+        removed = [self.assignable[role_id].name for role_id in current - desired]
+        logging.info(f"Updated roles for {member.display_name}: added [{', '.join(added)}], removed [{', '.join(removed)}]")
+        return added, removed
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return a copy of the counters plus the number of users waiting for their update."""
+        metrics = dict(self.metrics)
+        metrics["waiting"] = len(self.pending)
+        return metrics
@@ -0,0 +1,104 @@
+import logging
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set
+
+class RoleIndex:
+    """
+    Which members hold each of a few watched roles, as sets of member IDs.
+
+    The bot only ever asks about the alert roles, so instead of keeping every
+    Member object cached and testing `role in member.roles` one member at a
+    time, the index keeps one ID set per watched role. "Who should have Alert
+    Master" is then a set intersection, and a member without any watched role
+    costs nothing. The index is built once from a member chunk and kept
+    current from member join/update/remove events.
+    """
+
+    def __init__(self, role_ids: Iterable[int]):
+        self.holders: Dict[int, Set[int]] = {role_id: set() for role_id in role_ids}
+        self.bots: Set[int] = set()
+        self.guild_id: Optional[int] = None  # Set once the index is loaded
+        self.loaded_members = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.guild_id is not None
+
+    def update(self, member_id: int, role_ids: Iterable[int], bot: bool = False) -> FrozenSet[int]:
+        """Record a member's current roles. Returns the watched roles they held before."""
+        before = self.roles_of(member_id)
+        role_ids = set(role_ids)
+        for role_id, members in self.holders.items():
+            if role_id in role_ids:
+                members.add(member_id)
+            else:
+                members.discard(member_id)
+        if bot:
+            self.bots.add(member_id)
+        return before
+
+    def remove(self, member_id: int):
+        """Forget a member that left the server."""
+        for members in self.holders.values():
+            members.discard(member_id)
+        self.bots.discard(member_id)
+
+    def roles_of(self, member_id: int) -> FrozenSet[int]:
+        """Watched roles held by a member."""
+        return frozenset(role_id for role_id, members in self.holders.items() if member_id in members)
+
+    def members_with(self, role_id: int) -> Set[int]:
+        return self.holders.get(role_id, set())
+
+    def members_with_all(self, role_ids: Iterable[int]) -> Set[int]:
+        """Members holding every one of the given roles (bots excluded)."""
+        sets = sorted((self.members_with(role_id) for role_id in role_ids), key=len)
+        if not sets:
+            return set()
+        return sets[0].intersection(*sets[1:]) - self.bots
+
+    def load(self, guild_id: int, members: Iterable):
+        """Rebuild the index from a full list of discord.Member objects."""
+        for role_members in self.holders.values():
+            role_members.clear()
+        self.bots.clear()
+        count = 0
+        for member in members:
+            self.update(member.id, (role.id for role in member.roles), member.bot)
+            count += 1
+        self.guild_id = guild_id
+        self.loaded_members = count
+        logging.info(f"Role index loaded: {count} members, "
+                     + ", ".join(f"{role_id}={len(ids)}" for role_id, ids in self.holders.items()))
+
+    def apply_member_update(self, data: Dict) -> Optional[FrozenSet[int]]:
+        """
+        Apply a raw GUILD_MEMBER_UPDATE payload. Returns the watched roles the
+        member held before, or None if the event is for another server.
+        """
+        if not self.loaded or int(data["guild_id"]) != self.guild_id:
+            return None
+        user = data["user"]
+        return self.update(int(user["id"]), map(int, data.get("roles", ())), user.get("bot", False))
+
+    def get_metrics(self) -> Dict[int, int]:
+        """Number of members holding each watched role."""
+        return {role_id: len(members) for role_id, members in self.holders.items()}
+
+def watch_member_updates(client, callback: Callable[[Dict], None]):
+    """
+    Call `callback(data)` with every raw GUILD_MEMBER_UPDATE payload before
+    discord.py handles it. discord.py only dispatches on_member_update for
+    members it has cached, so this is how the index sees role changes of
+    members that are not in the member cache.
+    """
+    parsers = client._connection.parsers
+    original = parsers["GUILD_MEMBER_UPDATE"]
+
+    def parse_guild_member_update(data):
+        try:
+            callback(data)
+        except Exception as e:
+            logging.error(f"Member update hook failed: {e}", exc_info=True)
+        original(data)
+
+    parsers["GUILD_MEMBER_UPDATE"] = parse_guild_member_update
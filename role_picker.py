@@ -0,0 +1,105 @@
+import logging
+from typing import Awaitable, Callable, Dict, Set, Tuple
+import discord
+
+async def _report_error(interaction: discord.Interaction, error: Exception):
+    logging.error(f"Role picker failed for {interaction.user}: {error}", exc_info=error)
+    message = "❌ Could not update your roles, please try again later."
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+class RoleSelectView(discord.ui.View):
+    """
+    One user's role picker, sent as an ephemeral reply: a multi-select with
+    every alert role, with the roles they already have selected. Because it
+    starts from their current roles, the submitted selection is exactly the
+    set they want and is applied as such.
+    """
+
+    def __init__(self, roles: Dict[str, Tuple[int, str]], current: Set[int],
+                 apply: Callable[[discord.Interaction, Set[int]], Awaitable[None]]):
+        super().__init__(timeout=300)
+        self.apply = apply
+        self.select = discord.ui.Select(
+            placeholder="Choose your alert roles",
+            min_values=0,
+            max_values=len(roles),
+            options=[discord.SelectOption(label=label, value=str(role_id), emoji=emoji, default=role_id in current)
+                     for emoji, (role_id, label) in roles.items()]
+        )
+        self.select.callback = self.on_select
+        self.add_item(self.select)
+
+    async def on_select(self, interaction: discord.Interaction):
+        await self.apply(interaction, {int(value) for value in self.select.values})
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item: discord.ui.Item):
+        await _report_error(interaction, error)
+
+class ConfirmClearView(discord.ui.View):
+    """Ephemeral Yes/Cancel step before every alert role is removed."""
+
+    def __init__(self, apply: Callable[[discord.Interaction, Set[int]], Awaitable[None]]):
+        super().__init__(timeout=60)
+        self.apply = apply
+        confirm = discord.ui.Button(label="Yes, remove them", style=discord.ButtonStyle.danger)
+        confirm.callback = self.on_confirm
+        self.add_item(confirm)
+        cancel = discord.ui.Button(label="Cancel", style=discord.ButtonStyle.secondary)
+        cancel.callback = self.on_cancel
+        self.add_item(cancel)
+
+    async def on_confirm(self, interaction: discord.Interaction):
+        self.stop()
+        await self.apply(interaction, set())
+
+    async def on_cancel(self, interaction: discord.Interaction):
+        self.stop()
+        await interaction.response.edit_message(content="Your alert roles were left as they are.", view=None)
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item: discord.ui.Item):
+        await _report_error(interaction, error)
+
+class RolePickerView(discord.ui.View):
+    """
+    Persistent role picker attached to the role message: a button that opens
+    a RoleSelectView for the user who pressed it, and a button that drops
+    every alert role once the user confirms in a ConfirmClearView. A user's
+    whole selection arrives as one interaction, and
+    `apply(interaction, selected_role_ids)` turns it into a single role update.
+
+    The view has no timeout and fixed custom IDs, so after a restart
+    client.add_view() reconnects it to the message that is already posted.
+    """
+
+    def __init__(self, roles: Dict[str, Tuple[int, str]],
+                 apply: Callable[[discord.Interaction, Set[int]], Awaitable[None]]):
+        super().__init__(timeout=None)
+        self.roles = roles
+        self.apply = apply
+        self.role_ids = {role_id for role_id, _ in roles.values()}
+        choose = discord.ui.Button(custom_id="gagbot:role_picker:choose", label="Choose alert roles",
+                                   emoji="🔔", style=discord.ButtonStyle.primary)
+        choose.callback = self.on_choose
+        self.add_item(choose)
+        clear = discord.ui.Button(custom_id="gagbot:role_picker:clear", label="Remove all alert roles",
+                                  style=discord.ButtonStyle.secondary)
+        clear.callback = self.on_clear
+        self.add_item(clear)
+
+    def custom_ids(self) -> Set[str]:
+        return {item.custom_id for item in self.children}
+
+    async def on_choose(self, interaction: discord.Interaction):
+        current = {role.id for role in getattr(interaction.user, "roles", [])} & self.role_ids
+        view = RoleSelectView(self.roles, current, self.apply)
+        await interaction.response.send_message("Pick the alerts you want:", view=view, ephemeral=True)
+
+    async def on_clear(self, interaction: discord.Interaction):
+        await interaction.response.send_message("Remove all your alert roles?", view=ConfirmClearView(self.apply),
+                                                ephemeral=True)
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item: discord.ui.Item):
+        await _report_error(interaction, error)
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from state_store import StateStore
+
+ADD = "add"
+REMOVE = "remove"
+
+class RoleReconciler:
+    """
+    Applies a precomputed role diff in the background.
+
+    submit() takes the complete plan (which members need a role added or
+    removed) and merges it with any work resumed from the checkpoint; run()
+    works through it with at most `concurrency` requests in
+    flight, paced to `rate` changes per second. Whenever discord.py reports a
+    429 the pace is halved, and it recovers after a stretch without one. The
+    remaining work is checkpointed to disk, so after a restart the job picks up
+    where it stopped instead of starting over, and progress with an ETA is
+    logged every `progress_interval` seconds.
+
+    `apply(member_id, action)` does one change and returns False if there was
+    nothing to do; it should check the member's current roles first, because a
+    resumed plan may be out of date.
+    """
+
+    def __init__(self, apply: Callable[[int, str], Awaitable[bool]], checkpoint_path: str = 'role_reconcile.json',
+                 concurrency: int = 3, rate: float = 2, rate_limited: Optional[Callable[[], float]] = None,
+                 progress_interval: float = 30, clock: Callable[[], float] = time.monotonic):
+        self.apply = apply
+        self.concurrency = concurrency
+        self.base_interval = 1 / rate
+        self.interval = self.base_interval
+        self.rate_limited = rate_limited or (lambda: 0)  # Running count of 429s
+        self.progress_interval = progress_interval
+        self.clock = clock
+        self.pending: deque = deque()  # (member_id, action)
+        self.in_flight: Dict[int, str] = {}
+        self.total = 0
+        self.processed_before = 0
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at = None
+        self.resumed = False  # The checkpoint is only loaded once
+        self.store = StateStore(checkpoint_path, self.checkpoint, label="Role reconcile checkpoint")
+        self._wakeup = asyncio.Event()
+        self._next_slot = 0.0
+        self._pace_lock = asyncio.Lock()
+        self._last_rate_limited = 0
+        self._clean_streak = 0
+
+    def checkpoint(self) -> Dict:
+        """Work that is not finished yet, including changes that are in flight."""
+        return {
+            "pending": [[member_id, action] for member_id, action in self.in_flight.items()]
+                       + [list(item) for item in self.pending],
+            "total": self.total
+        }
+
+    def submit(self, to_add: Iterable[int], to_remove: Iterable[int]):
+        """
+        Start a fresh plan. Checkpointed work keeps its place and its progress:
+        entries the fresh plan still contains stay in their saved order, the
+        ones it no longer contains are dropped (done or out of date) and new
+        entries are added after them.
+        """
+        self.resume()
+        plan = [(member_id, ADD) for member_id in to_add] + [(member_id, REMOVE) for member_id in to_remove]
+        wanted = set(plan)
+        kept = [item for item in self.pending if item in wanted]
+        known = set(kept)
+        new = [item for item in plan if item not in known]
+        processed = self.total - len(self.pending) if self.pending else 0  # Done before the restart
+        self.pending = deque(kept + new)
+        self._start(processed + len(self.pending))
+        logging.info(f"Role reconcile planned: {sum(1 for _, action in plan if action == ADD)} to add, "
+                     f"{sum(1 for _, action in plan if action == REMOVE)} to remove"
+                     + (f" ({len(kept)} resumed from the checkpoint)" if kept else ""))
+
+    def _start(self, total: int):
+        self.total = total
+        self.processed_before = total - len(self.pending)  # Finished before a restart
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at = self.clock()
+        self.store.mark_dirty()
+        self._wakeup.set()
+
+    def resume(self) -> bool:
+        """Load the checkpoint left by a previous run (once). Returns True if there is work to resume."""
+        if self.resumed:
+            return False
+        self.resumed = True
+        saved = self.store.load()
+        if not saved or not saved.get("pending") or self.pending:
+            return False
+        self.pending = deque((int(member_id), action) for member_id, action in saved["pending"])
+        self._start(max(saved.get("total", 0), len(self.pending)))
+        logging.info(f"Resuming role reconcile: {len(self.pending)} changes left of {self.total}")
+        return True
+
+    async def _pace(self):
+        """Wait for the next free slot, slowing down when Discord has been rate limiting us."""
+        async with self._pace_lock:
+            seen = self.rate_limited()
+            if seen > self._last_rate_limited:
+                self.interval = min(self.interval * 2, 30)
+                self._clean_streak = 0
+                logging.warning(f"Role reconcile hit a rate limit, slowing to one change every {self.interval:.1f}s")
+            else:
+                self._clean_streak += 1
+                if self._clean_streak >= 50 and self.interval > self.base_interval:
+                    self.interval = max(self.base_interval, self.interval / 2)
+                    self._clean_streak = 0
+            self._last_rate_limited = seen
+
+            now = self.clock()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _worker(self):
+        while self.pending:
+            member_id, action = self.pending.popleft()
+            self.in_flight[member_id] = action
+            try:
+                await self._pace()
+                if await self.apply(member_id, action):
+                    self.done += 1
+                else:
+                    self.skipped += 1
+            except asyncio.CancelledError:
+                self.pending.appendleft((member_id, action))  # Redo it after a restart
+                raise
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Role reconcile could not {action} role for member {member_id}: {e}")
+            finally:
+                self.in_flight.pop(member_id, None)
+                self.store.mark_dirty()
+
+    def progress(self) -> Tuple[int, int, Optional[float]]:
+        """(processed, total, estimated seconds left) for the current run."""
+        remaining = len(self.pending) + len(self.in_flight)
+        processed = self.total - remaining
+        # Only work done since the (re)start says anything about the current pace
+        session = processed - self.processed_before
+        elapsed = self.clock() - self.started_at if self.started_at is not None else 0
+        eta = remaining * elapsed / session if session > 0 and elapsed > 0 else None
+        return processed, self.total, eta
+
+    def _log_progress(self):
+        processed, total, eta = self.progress()
+        eta_text = f"{eta / 60:.1f} min" if eta is not None else "unknown"
+        logging.info(f"Role reconcile: {processed}/{total} ({self.done} changed, {self.skipped} unchanged, "
+                     f"{self.failed} failed), ETA {eta_text}")
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._log_progress()
+            await self.store.flush()
+
+    async def run(self):
+        """Work through submitted plans until cancelled, starting with any checkpointed work."""
+        self.resume()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self.pending:
+                await self.store.flush()  # An empty plan still replaces the old checkpoint
+                continue
+            reporter = asyncio.create_task(self._report())
+            try:
+                await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+            finally:
+                reporter.cancel()
+                await self.store.flush()
+            elapsed = self.clock() - self.started_at
+            logging.info(f"Role reconcile finished in {elapsed:.0f}s: {self.done} changed, "
+                         f"{self.skipped} unchanged, {self.failed} failed")
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "pending": len(self.pending) + len(self.in_flight),
+            "done": self.done,
+            "skipped": self.skipped,
+            "failed": self.failed
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+# What to do when a job falls behind by more than its grace period
+SKIP = "skip"          # Drop the missed runs and wait for the next boundary
+CATCH_UP = "catch_up"  # Run once for every missed boundary, back to back
+COALESCE = "coalesce"  # Run once right away, then continue on the normal boundaries
+
+class Job:
+    """A recurring background job and the bookkeeping the scheduler keeps for it."""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable], every: float,
+                 offset: Union[float, Callable[[], float]] = 0, align: bool = True,
+                 jitter: float = 0, deadline: Optional[float] = None,
+                 misfire: str = COALESCE, grace: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.every = every
+        self.offset = offset
+        self.align = align
+        self.jitter = jitter
+        self.deadline = deadline
+        self.misfire = misfire
+        self.grace = grace if grace is not None else min(every / 2, 60)
+
+        self.next_run = None       # Wall-clock time of the next scheduled run
+        self.not_before = None     # Set by Scheduler.defer(): the next run is planned after this time
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.missed = 0
+        self.last_lateness = None  # Seconds between the scheduled time and the actual start
+        self.last_duration = None
+        self.last_error = None
+
+    def get_offset(self) -> float:
+        return self.offset() if callable(self.offset) else self.offset
+
+    def boundary_after(self, when: float) -> float:
+        """The first scheduled time strictly after `when`."""
+        if not self.align:
+            return when + self.every
+        offset = self.get_offset()
+        return (math.floor((when - offset) / self.every) + 1) * self.every + offset
+
+    def status(self) -> Dict:
+        return {
+            "name": self.name,
+            "next_run": self.next_run,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "missed": self.missed,
+            "last_lateness": self.last_lateness,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error
+        }
+
+class Scheduler:
+    """
+    Runs every recurring background job of the bot.
+
+    Aligned jobs fire on wall-clock boundaries (every N seconds plus an offset,
+    e.g. every 5 minutes at +7s), interval jobs fire every N seconds counted from
+    when the scheduler started. The boundary is converted to a monotonic deadline once, so waits are
+    not affected by wall-clock adjustments. Each job runs in its own task and
+    never overlaps with itself; a job that falls behind is handled by its
+    misfire policy.
+
+    The clock, wall clock and sleep function can be swapped out, which lets the
+    timing logic run against a simulated clock.
+    """
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None,
+                 wall: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep,
+                 on_error: Optional[Callable[[str], Awaitable]] = None):
+        self.clock = clock
+        self.wall = wall
+        self.sleep = sleep
+        self.on_error = on_error
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], every: float, **kwargs) -> Job:
+        """Register a job. See Job for the available options."""
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already registered")
+        job = Job(name, func, every, **kwargs)
+        self.jobs[name] = job
+        return job
+
+    def defer(self, name: str, until: float):
+        """Plan the job's next run on its first boundary after `until` instead of after the current run."""
+        self.jobs[name].not_before = until
+
+    def _monotonic(self) -> float:
+        if self.clock:
+            return self.clock()
+        return asyncio.get_running_loop().time()
+
+    async def _sleep_until(self, when: float):
+        """Sleep until the wall-clock time `when`, measured on the monotonic clock."""
+        target = self._monotonic() + (when - self.wall())
+        while True:
+            remaining = target - self._monotonic()
+            if remaining <= 0:
+                return
+            await self.sleep(remaining)
+
+    def _plan_next(self, job: Job, scheduled: float):
+        """Pick the next run after one scheduled at `scheduled`, applying the misfire policy."""
+        now = self.wall()
+        next_run = job.boundary_after(max(scheduled, job.not_before or scheduled))
+        job.not_before = None
+        if next_run + job.grace >= now:
+            job.next_run = next_run
+            return
+
+        # We are behind - count the boundaries that have already passed
+        missed = []
+        while next_run + job.grace < now:
+            missed.append(next_run)
+            next_run = job.boundary_after(next_run)
+
+        if job.misfire == CATCH_UP:
+            job.next_run = missed[0]
+        elif job.misfire == COALESCE:
+            job.missed += len(missed) - 1
+            job.next_run = missed[-1]
+        else:
+            job.missed += len(missed)
+            job.next_run = next_run
+        logging.warning(f"Job {job.name} is behind by {len(missed)} run(s) ({job.misfire})")
+
+    async def _execute(self, job: Job, run_at: float):
+        job.running = True
+        started = self._monotonic()
+        job.last_lateness = max(0.0, self.wall() - run_at)
+        try:
+            if job.deadline:
+                await asyncio.wait_for(job.func(), timeout=job.deadline)
+            else:
+                await job.func()
+            job.last_error = None
+        except asyncio.TimeoutError:
+            job.timeouts += 1
+            job.last_error = f"Timed out after {job.deadline}s"
+            await self._report(f"Job {job.name} timed out after {job.deadline}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logging.error(f"Error in job {job.name}: {e}", exc_info=True)
+            await self._report(f"Error in job {job.name}: {e}")
+        finally:
+            job.running = False
+            job.runs += 1
+            job.last_duration = self._monotonic() - started
+
+    async def _report(self, message: str):
+        if self.on_error:
+            try:
+                await self.on_error(message)
+            except Exception as e:
+                logging.error(f"Failed to report scheduler error: {e}")
+
+    async def _run_job(self, job: Job):
+        job.next_run = job.boundary_after(self.wall())
+        while True:
+            scheduled = job.next_run
+            run_at = scheduled + (random.uniform(0, job.jitter) if job.jitter else 0)
+            await self._sleep_until(run_at)
+            await self._execute(job, run_at)
+            self._plan_next(job, scheduled)
+
+    def start(self):
+        """Start every registered job that is not already running."""
+        for name, job in self.jobs.items():
+            task = self._tasks.get(name)
+            if task is None or task.done():
+                self._tasks[name] = asyncio.create_task(self._run_job(job), name=f"job:{name}")
+
+    async def run(self):
+        """Start all jobs and wait on them (for running the scheduler as one task)."""
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks.values())
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Cancel all job tasks and wait for them to finish."""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def status(self) -> List[Dict]:
+        """Status of every job, ordered by next run."""
+        return sorted((job.status() for job in self.jobs.values()),
+                      key=lambda status: status["next_run"] or float("inf"))
@@ -1,17 +1,120 @@
 import logging
 import json
 import asyncio
+import time
 from typing import Dict, List
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, TimeoutError
+import aiohttp
 from api import api_fallback
+from logging_setup import setup_logging
+from timing import timings
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s',
-    datefmt='%H:%M:%S'
-)
+STOCK_URL = "https://growagardenvalues.com/stock/stocks.php"
+
+def parse_stock_page(content: str) -> Dict[str, List[Dict]]:
+    """
+    Parses the stock sections of the stock page HTML.
+    Returns a dictionary containing lists of items with their details for each category.
+    """
+    from bs4 import BeautifulSoup  # Imported on first use to keep startup fast
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Initialize results dictionary with more detailed categories
+    results = {
+        "seeds": [],
+        "gears": [],
+        "eggs": [],
+        "weather": [],
+        "event_shop": []
+    }
+
+    # Map section IDs to category names
+    section_to_category = {
+        "seeds-section": "seeds",
+        "gears-section": "gears",
+        "eggs-section": "eggs",
+        "weather-section": "weather",
+        "event-shop-stock-section": "event_shop"
+    }
+
+    # Find all stock sections and filter out cosmetics
+    stock_sections = soup.find_all('section', class_='stock-section')
+    valid_sections = [section for section in stock_sections 
+                    if section.get('id') in section_to_category]
+    logging.debug(f"Found {len(valid_sections)} sections")
+
+    for section in valid_sections:
+        try:
+            # Get the section ID to determine category
+            section_id = section.get('id', '')
+            if not section_id:
+                continue
+
+            # Map section ID to category name
+            category = section_to_category.get(section_id)
+            if not category:
+                continue
+
+            # Find all items in this section
+            items = section.find_all('div', class_='stock-item')
+
+            for item in items:
+                try:
+                    # Get item details
+                    name_elem = item.find('div', class_='item-name')
+                    quantity_elem = item.find('div', class_='item-quantity')
+
+                    if not name_elem:
+                        continue
+
+                    item_name = name_elem.text.strip()
+                    quantity = quantity_elem.text.strip() if quantity_elem else "x0"
+
+                    # Remove 'x' prefix and convert to integer
+                    quantity = int(quantity.replace('x', '')) if quantity.startswith('x') else 0
+
+                    # Format item name with quantity
+                    formatted_name = f"{item_name} (x{quantity})"
+
+                    item_data = {
+                        "name": formatted_name,
+                        "quantity": quantity,
+                        "original_name": item_name
+                    }
+
+                    # Add image URL if available
+                    img_elem = item.find('img')
+                    if img_elem and img_elem.get('src'):
+                        item_data["image_url"] = img_elem['src']
+
+                    # Handle special cases
+                    if category == 'weather':
+                        # Weather items have emoji and time information
+                        emoji_elem = item.find('span', style="font-size: 2em;")
+                        if emoji_elem:
+                            item_data["emoji"] = emoji_elem.text.strip()
+                        if quantity_elem:
+                            item_data["time_info"] = quantity_elem.text.strip()
+                            formatted_name = f"{item_name} - {quantity_elem.text.strip()}"
+                            item_data["name"] = formatted_name
+
+                    # Add to appropriate category
+                    results[category].append(item_data)
+
+                except Exception as e:
+                    logging.debug(f"Failed to process item in {category}: {e}")
+                    continue
+
+        except Exception as e:
+            logging.debug(f"Failed to process section: {e}")
+            continue
+
+    # Log summary of items found
+    for category, items in results.items():
+        if items:
+            logging.debug(f"Found {len(items)} items in {category}")
+
+    return results
 
 async def fetch_stock_data() -> Dict[str, List[Dict]]:
     """
@@ -36,8 +139,12 @@ async def fetch_stock_data() -> Dict[str, List[Dict]]:
             }
 
     try:
-        url = "https://growagardenvalues.com/stock/stocks.php"
+        # Playwright is only imported once the browser path is actually used
+        from playwright.async_api import async_playwright, TimeoutError
+
+        url = STOCK_URL
         
+        scrape_started = time.perf_counter()
         async with async_playwright() as p:
             # Launch browser with optimized settings
             browser = await p.chromium.launch(
@@ -77,6 +184,7 @@ async def fetch_stock_data() -> Dict[str, List[Dict]]:
                 java_script_enabled=True,
                 bypass_csp=True
             )
+            timings.observe("scrape.browser_launch", time.perf_counter() - scrape_started)
             
             try:
                 # Create a new page
@@ -92,11 +200,13 @@ async def fetch_stock_data() -> Dict[str, List[Dict]]:
                 for attempt in range(max_retries):
                     try:
                         # Navigate to the page with increased timeout
-                        await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                        with timings.span("scrape.goto"):
+                            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
                         
                         # Wait for the stock sections to be visible with a more lenient timeout
                         try:
-                            await page.wait_for_selector('section.stock-section', timeout=15000)
+                            with timings.span("scrape.wait_selector"):
+                                await page.wait_for_selector('section.stock-section', timeout=15000)
                         except TimeoutError:
                             # If we timeout waiting for sections, try to get content anyway
                             logging.warning("Timeout waiting for stock sections, proceeding with available content")
@@ -129,108 +239,13 @@ async def fetch_stock_data() -> Dict[str, List[Dict]]:
                                 "event_shop": []
                             }
                 
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Initialize results dictionary with more detailed categories
-                results = {
-                    "seeds": [],
-                    "gears": [],
-                    "eggs": [],
-                    "weather": [],
-                    "event_shop": []
-                }
-                
-                # Map section IDs to category names
-                section_to_category = {
-                    "seeds-section": "seeds",
-                    "gears-section": "gears",
-                    "eggs-section": "eggs",
-                    "weather-section": "weather",
-                    "event-shop-stock-section": "event_shop"
-                }
-                
-                # Find all stock sections and filter out cosmetics
-                stock_sections = soup.find_all('section', class_='stock-section')
-                valid_sections = [section for section in stock_sections 
-                                if section.get('id') in section_to_category]
-                logging.info(f"Found {len(valid_sections)} sections")
-                
-                for section in valid_sections:
-                    try:
-                        # Get the section ID to determine category
-                        section_id = section.get('id', '')
-                        if not section_id:
-                            continue
-                            
-                        # Map section ID to category name
-                        category = section_to_category.get(section_id)
-                        if not category:
-                            continue
-                            
-                        # Find all items in this section
-                        items = section.find_all('div', class_='stock-item')
-                        
-                        for item in items:
-                            try:
-                                # Get item details
-                                name_elem = item.find('div', class_='item-name')
-                                quantity_elem = item.find('div', class_='item-quantity')
-                                
-                                if not name_elem:
-                                    continue
-                                    
-                                item_name = name_elem.text.strip()
-                                quantity = quantity_elem.text.strip() if quantity_elem else "x0"
-                                
-                                # Remove 'x' prefix and convert to integer
-                                quantity = int(quantity.replace('x', '')) if quantity.startswith('x') else 0
-                                
-                                # Format item name with quantity
-                                formatted_name = f"{item_name} (x{quantity})"
-                                
-                                item_data = {
-                                    "name": formatted_name,
-                                    "quantity": quantity,
-                                    "original_name": item_name
-                                }
-                                
-                                # Add image URL if available
-                                img_elem = item.find('img')
-                                if img_elem and img_elem.get('src'):
-                                    item_data["image_url"] = img_elem['src']
-                                
-                                # Handle special cases
-                                if category == 'weather':
-                                    # Weather items have emoji and time information
-                                    emoji_elem = item.find('span', style="font-size: 2em;")
-                                    if emoji_elem:
-                                        item_data["emoji"] = emoji_elem.text.strip()
-                                    if quantity_elem:
-                                        item_data["time_info"] = quantity_elem.text.strip()
-                                        formatted_name = f"{item_name} - {quantity_elem.text.strip()}"
-                                        item_data["name"] = formatted_name
-                                
-                                # Add to appropriate category
-                                results[category].append(item_data)
-                                    
-                            except Exception as e:
-                                logging.debug(f"Failed to process item in {category}: {e}")
-                                continue
-                            
-                    except Exception as e:
-                        logging.debug(f"Failed to process section: {e}")
-                        continue
-                
-                # Log summary of items found
-                for category, items in results.items():
-                    if items:
-                        logging.info(f"Found {len(items)} items in {category}")
-                
-                return results
+                with timings.span("scrape.parse"):
+                    return parse_stock_page(content)
                 
             finally:
                 # Ensure browser is closed even if an error occurs
                 await browser.close()
+                timings.observe("scrape.total", time.perf_counter() - scrape_started)
             
     except Exception as e:
         logging.error(f"Failed to fetch stock data: {e}")
@@ -244,10 +259,51 @@ async def fetch_stock_data() -> Dict[str, List[Dict]]:
             "event_shop": []
         }
 
+async def fetch_stock_data_http() -> Dict[str, List[Dict]]:
+    """
+    Reads the stock page with a plain HTTP request instead of a browser, so
+    Playwright is never loaded. Uses the fallback API the same way as
+    fetch_stock_data() and returns data in the same format.
+    """
+    if api_fallback.should_use_fallback():
+        logging.info("Using fallback API as main website is temporarily unavailable")
+        api_data = await api_fallback.fetch_stock_data()
+        if api_data:
+            return api_data
+        logging.error("Fallback API also failed")
+        return {
+            "seeds": [],
+            "gears": [],
+            "eggs": [],
+            "weather": [],
+            "event_shop": []
+        }
+
+    try:
+        with timings.span("scrape.http"):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(STOCK_URL, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    response.raise_for_status()
+                    content = await response.text()
+        if 'stock-section' not in content:
+            raise Exception("Page content doesn't contain stock sections")
+        with timings.span("scrape.parse"):
+            return parse_stock_page(content)
+    except Exception as e:
+        logging.error(f"Failed to fetch stock data over HTTP: {e}")
+        return {
+            "seeds": [],
+            "gears": [],
+            "eggs": [],
+            "weather": [],
+            "event_shop": []
+        }
+
 def main():
     """
     Test function to verify the scraper works
     """
+    setup_logging()
     stock_data = asyncio.run(fetch_stock_data())
     print(json.dumps(stock_data, indent=2))
 
@@ -0,0 +1,331 @@
+"""
+Fast-forward harness for the bot's timing loops.
+
+Runs the real scheduler jobs (stock posts, weather checks, fallback monitor and
+harvest pings) on a virtual clock against stubbed stock sources and a stubbed
+Discord, so hours of loop behaviour take a few seconds. It reports the post
+cadence, how late each post was relative to its 5-minute boundary, and how
+many fetches were made per simulated hour.
+
+    python simulate.py --hours 6 --scenario outage
+"""
+import argparse
+import asyncio
+import logging
+import os
+import selectors
+import statistics
+import sys
+import tempfile
+import types
+from datetime import datetime, timezone
+from logging_setup import setup_logging
+
+# 2025-01-01 12:00:00 UTC, a few seconds before a 5-minute boundary
+DEFAULT_START = 1735732800 - 17
+
+class _FastForwardSelector:
+    """Selector wrapper that jumps the virtual clock instead of blocking."""
+
+    def __init__(self, selector: selectors.BaseSelector, loop: "VirtualEventLoop"):
+        self._selector = selector
+        self._loop = loop
+
+    def select(self, timeout=None):
+        if timeout and timeout > 0:
+            self._loop.advance(timeout)
+        return self._selector.select(0)
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose clock only moves when every task is waiting on a timer.
+    asyncio.sleep, wait_for and call_later all run in virtual time, so nothing
+    in the code under test has to know it is being fast-forwarded.
+    """
+
+    def __init__(self, start_wall: float = DEFAULT_START):
+        super().__init__()
+        self._now = 0.0
+        self.start_wall = start_wall
+        self._selector = _FastForwardSelector(self._selector, self)
+
+    def time(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float):
+        self._now += seconds
+
+    def wall(self) -> float:
+        """Virtual wall-clock time (Unix seconds)."""
+        return self.start_wall + self._now
+
+def make_virtual_datetime(loop: VirtualEventLoop):
+    """A datetime class whose now() follows the virtual wall clock."""
+    class VirtualDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(loop.wall(), tz or timezone.utc)
+    return VirtualDatetime
+
+class FakeMessage:
+    def __init__(self, channel, message_id, kwargs):
+        self.channel = channel
+        self.id = message_id
+        self.kwargs = kwargs
+
+    async def edit(self, **kwargs):
+        self.channel.edits.append((self.channel.loop.wall(), kwargs))
+        self.kwargs.update(kwargs)
+        return self
+
+class FakeChannel:
+    """Records everything the bot sends instead of talking to Discord."""
+
+    GUILD = types.SimpleNamespace(id=1, name="Simulated server")  # Every channel is in the home server
+
+    def __init__(self, channel_id: int, name: str, loop: VirtualEventLoop):
+        self.id = channel_id
+        self.name = name
+        self.guild = self.GUILD
+        self.loop = loop
+        self.sent = []   # (virtual wall time, send kwargs)
+        self.edits = []
+        self.messages = {}
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def send(self, content=None, **kwargs):
+        if content is not None:
+            kwargs["content"] = content
+        self.sent.append((self.loop.wall(), kwargs))
+        message = FakeMessage(self, len(self.sent), kwargs)
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id):
+        return self.messages.get(message_id) or FakeMessage(self, message_id, {})
+
+class Scenario:
+    """
+    Stubbed stock sources. Each 5-minute slot has its own seed list; during an
+    outage the main website keeps serving the snapshot from when it broke and
+    fails its health check, while the backup API stays current. The weather
+    changes every WEATHER_EVERY seconds, off the 5-minute boundaries.
+    """
+
+    WEATHER_EVERY = 1200
+    WEATHER_CYCLE = ["Rain", "Thunderstorm", "Frost", "Disco"]
+
+    def __init__(self, loop: VirtualEventLoop, outage=None, scrape_seconds=4.0, api_seconds=0.5):
+        self.loop = loop
+        self.outage = outage  # (start, end) in seconds from the start of the run
+        self.scrape_seconds = scrape_seconds
+        self.api_seconds = api_seconds
+        self.fetches = []      # (virtual wall time, source)
+        self.health_checks = []
+        self.weather_requests = []
+
+    def weather_changes(self, until: float):
+        """Wall-clock times at which the weather changed, up to `until` seconds into the run."""
+        return [self.loop.start_wall + t for t in range(433, int(until), self.WEATHER_EVERY)]
+
+    def weather(self, wall: float):
+        elapsed = wall - self.loop.start_wall - 433
+        index = int(elapsed // self.WEATHER_EVERY) + 1 if elapsed >= 0 else 0
+        return [f"{self.WEATHER_CYCLE[index % len(self.WEATHER_CYCLE)]} - Most Recent"]
+
+    def in_outage(self) -> bool:
+        if not self.outage:
+            return False
+        elapsed = self.loop.time()
+        return self.outage[0] <= elapsed < self.outage[1]
+
+    def snapshot(self, wall: float):
+        slot = int(wall // 300)
+        return {
+            "seeds": [f"Carrot (x{slot % 7 + 1})", f"Tomato (x{slot})"],
+            "gear": ["Watering Can (x2)"],
+            "egg": ["Common Egg (x1)"],
+            "weather": self.weather(wall)
+        }
+
+    async def fetch_all_stock(self, client):
+        if client.is_website_broken:
+            await asyncio.sleep(self.api_seconds)
+            self.fetches.append((self.loop.wall(), "api"))
+            data = self.snapshot(self.loop.wall())
+            data["weather"] = []
+            return data
+        await asyncio.sleep(self.scrape_seconds)
+        self.fetches.append((self.loop.wall(), "scrape"))
+        if self.in_outage():
+            return self.snapshot(self.loop.start_wall + self.outage[0])
+        return self.snapshot(self.loop.wall())
+
+    async def download_weather(self):
+        """Stand-in for the weather probe's plain HTTP fetch of the stock page."""
+        await asyncio.sleep(0.3)
+        self.weather_requests.append(self.loop.wall())
+        items = "".join(f'<div class="stock-item"><div class="item-name">{line.split(" - ")[0]}</div>'
+                        f'<div class="item-quantity">Most Recent</div></div>' for line in self.weather(self.loop.wall()))
+        return f'<section class="stock-section" id="weather-section">{items}</section>'
+
+    async def check_main_website_health(self):
+        await asyncio.sleep(self.scrape_seconds)
+        self.health_checks.append(self.loop.wall())
+        return not self.in_outage()
+
+def install_stub_config():
+    """Give the bot a config with fixed fake IDs so nothing reaches a real server."""
+    config = types.ModuleType("config")
+    config.TOKEN = "simulation"
+    names = ["STOCK_CHANNEL_ID", "ROLE_CHANNEL_ID", "LOGS_CHANNEL_ID", "NEWS_CHANNEL_ID", "TEST_CHANNEL_ID",
+             "UPDATES_CHANNEL_ID", "HARVEST_CHANNEL_ID", "WEATHER_CHANNEL_ID", "WELCOME_CHANNEL_ID", "ABOUT_CHANNEL_ID"]
+    for index, name in enumerate(names, 1):
+        setattr(config, name, index)
+    config.EMOJI_ROLE_MAP = {"🦄": 101, "🌟": 102, "🥚": 103, "🧰": 104, "🌧️": 105, "🔥": 106, "🌽": 107}
+    config.ALERT_ROLE_ID = 100
+    sys.modules["config"] = config
+    return config
+
+def summarize(times, boundaries_every=300):
+    """Cadence and lateness statistics for a list of post times."""
+    if not times:
+        return {"count": 0}
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    lateness = [t % boundaries_every for t in times]
+    return {
+        "count": len(times),
+        "cadence_median": statistics.median(gaps) if gaps else None,
+        "cadence_min": min(gaps) if gaps else None,
+        "cadence_max": max(gaps) if gaps else None,
+        "lateness_median": statistics.median(lateness),
+        "lateness_max": max(lateness)
+    }
+
+# Titles of the stock snapshot embed (format_embed); alert embeds in the stock channel are not stock posts
+STOCK_EMBED_TITLES = ("🛒 Grow A Garden Shop Update", "⚠️ No stock data available.")
+
+def is_stock_post(kwargs):
+    """Whether a send was a stock snapshot (alone, or first in a digest)."""
+    embeds = [kwargs["embed"]] if kwargs.get("embed") else kwargs.get("embeds") or []
+    return bool(embeds) and embeds[0].title in STOCK_EMBED_TITLES
+
+def weather_alert_delays(alerts, changes):
+    """Seconds from each weather change to the alert that followed it (special weather only)."""
+    delays = []
+    for sent_at, _ in alerts:
+        before = [t for t in changes if t <= sent_at]
+        if before:
+            delays.append(sent_at - before[-1])
+    return delays
+
+def run_simulation(hours: float = 6, outage=None, start_wall: float = DEFAULT_START, verbose: bool = False):
+    """
+    Run the bot's scheduler for `hours` of virtual time and return a report.
+    `outage` is a (start, end) pair of seconds during which the main website is stale.
+    """
+    workdir = tempfile.mkdtemp(prefix="gagbot-sim-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # Keep bot_cache.json and friends away from the real ones
+
+    loop = VirtualEventLoop(start_wall)
+    asyncio.set_event_loop(loop)
+    try:
+        config = install_stub_config()
+        import gagbot
+        setup_logging(logging.INFO if verbose else logging.ERROR)
+
+        scenario = Scenario(loop, outage=outage)
+        client = gagbot.create_client()
+        channels = {channel_id: FakeChannel(channel_id, name, loop) for name, channel_id in
+                    (("stock", config.STOCK_CHANNEL_ID), ("news", config.NEWS_CHANNEL_ID),
+                     ("weather", config.WEATHER_CHANNEL_ID), ("harvest", config.HARVEST_CHANNEL_ID),
+                     ("logs", config.LOGS_CHANNEL_ID))}
+
+        # Swap in the virtual clock and the stubs
+        gagbot.datetime = make_virtual_datetime(loop)
+        gagbot.time = types.SimpleNamespace(time=loop.wall, monotonic=loop.time, perf_counter=loop.time)
+        gagbot.fetch_all_stock = lambda: scenario.fetch_all_stock(client)
+        gagbot.check_main_website_health = scenario.check_main_website_health
+        gagbot.weather_probe._download = scenario.download_weather
+        gagbot.weather_probe.clock = loop.time
+        gagbot.guild_configs.guilds = {}
+        client.get_channel = channels.get
+        client.scheduler.wall = loop.wall
+        client.last_data = None
+        client.is_website_broken = False
+        client.fallback_switch_time = None
+        client.live_boards = {}
+
+        async def run():
+            task = asyncio.ensure_future(client.scheduler.run())
+            await asyncio.sleep(hours * 3600)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        loop.run_until_complete(run())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+        os.chdir(previous_cwd)
+
+    stock_posts = [t for t, kwargs in channels[config.STOCK_CHANNEL_ID].sent if is_stock_post(kwargs)]
+    report = {
+        "hours": hours,
+        "stock_posts": summarize(stock_posts),
+        "harvest_pings": len(channels[config.HARVEST_CHANNEL_ID].sent),
+        "health_checks": len(scenario.health_checks),
+        "weather_alert_delays": weather_alert_delays(channels[config.WEATHER_CHANNEL_ID].sent,
+                                                     scenario.weather_changes(hours * 3600)),
+        "per_hour": []
+    }
+    for hour in range(int(hours)):
+        start = start_wall + hour * 3600
+        end = start + 3600
+        report["per_hour"].append({
+            "hour": hour,
+            "posts": sum(1 for t in stock_posts if start <= t < end),
+            "fetches": sum(1 for t, _ in scenario.fetches if start <= t < end),
+            "scrapes": sum(1 for t, source in scenario.fetches if start <= t < end and source == "scrape"),
+            "weather_requests": sum(1 for t in scenario.weather_requests if start <= t < end),
+            "late_posts": sum(1 for t in stock_posts if start <= t < end and t % 300 > 120)
+        })
+    report["jobs"] = client.scheduler.status()
+    return report
+
+def main():
+    """Command-line entry point: print a simulation report."""
+    parser = argparse.ArgumentParser(description="Fast-forward the bot's timing loops on a virtual clock")
+    parser.add_argument("--hours", type=float, default=6, help="Simulated hours to run")
+    parser.add_argument("--scenario", choices=["steady", "outage"], default="outage",
+                        help="'outage' makes the main website stale from hour 1 to hour 3")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own log output")
+    args = parser.parse_args()
+
+    outage = (3600, 3 * 3600) if args.scenario == "outage" else None
+    report = run_simulation(args.hours, outage=outage, verbose=args.verbose)
+
+    posts = report["stock_posts"]
+    print(f"Simulated {report['hours']}h - {posts['count']} stock posts, "
+          f"{report['harvest_pings']} harvest pings, {report['health_checks']} health checks")
+    if posts["count"]:
+        print(f"Cadence: median {posts['cadence_median']}s (min {posts['cadence_min']}s, max {posts['cadence_max']}s)")
+        print(f"Lateness after 5-minute mark: median {posts['lateness_median']:.1f}s, max {posts['lateness_max']:.1f}s")
+    delays = report["weather_alert_delays"]
+    if delays:
+        print(f"Weather alerts: {len(delays)}, {min(delays):.1f}-{max(delays):.1f}s after the change")
+    print("Hour | Posts | Fetches | Scrapes | Weather requests | Posts >2min late")
+    for hour in report["per_hour"]:
+        print(f"{hour['hour']:>4} | {hour['posts']:>5} | {hour['fetches']:>7} | {hour['scrapes']:>7} | "
+              f"{hour['weather_requests']:>16} | {hour['late_posts']:>5}")
+    for job in report["jobs"]:
+        print(f"Job {job['name']}: {job['runs']} runs, {job['failures']} failed, {job['timeouts']} timed out, {job['missed']} missed")
+
+if __name__ == "__main__":
+    main()
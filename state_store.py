@@ -0,0 +1,98 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+class StateStore:
+    """
+    Debounced, atomic writer for the bot's cache file.
+
+    Callers only mark the state as changed; the writer waits `debounce` seconds
+    so that several changes in one cycle become a single write, then takes one
+    snapshot, serializes it and writes it to a temp file that replaces the cache
+    file with an atomic rename. Only copying the snapshot happens on the event
+    loop; serializing and the disk work run in a worker thread, and a crash
+    mid-write leaves the previous file intact.
+    """
+
+    def __init__(self, path: str, snapshot: Callable[[], Dict], debounce: float = 2, label: str = "Bot state"):
+        self.path = path
+        self.label = label  # What the file holds, for the log lines
+        self.snapshot = snapshot
+        self.debounce = debounce
+        self.dirty = False
+        self.metrics = {
+            "requested": 0,
+            "written": 0,
+            "failures": 0
+        }
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def load(self) -> Optional[Dict]:
+        """
+        Read the cache file. Returns None if there is none; an unreadable file
+        is moved aside to <path>.corrupt instead of being silently overwritten.
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading cache: {e}")
+            try:
+                os.replace(self.path, self.path + ".corrupt")
+                logging.error(f"Moved unreadable cache to {self.path}.corrupt")
+            except OSError as move_error:
+                logging.error(f"Could not move unreadable cache aside: {move_error}")
+            return None
+
+    def mark_dirty(self):
+        """Note that the state changed; it will be written after the debounce window."""
+        self.metrics["requested"] += 1
+        self.dirty = True
+        self._wakeup.set()
+
+    def _write(self, state: Dict):
+        text = json.dumps(state)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def flush(self):
+        """Write the state now if it changed since the last write."""
+        async with self._lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            try:
+                # A deep copy, so the bot can keep changing its state while the thread encodes it
+                state = copy.deepcopy(self.snapshot())
+                await asyncio.to_thread(self._write, state)
+                self.metrics["written"] += 1
+                logging.info(f"{self.label} saved to {self.path}")
+            except Exception as e:
+                self.dirty = True
+                self._wakeup.set()  # Try again after the next debounce window
+                self.metrics["failures"] += 1
+                logging.error(f"Error saving {self.label.lower()} to {self.path}: {e}")
+
+    async def run(self):
+        """Writer loop: waits for a change, lets the debounce window pass, then writes once."""
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            await self.flush()
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return a copy of the writer counters plus whether a write is pending."""
+        metrics = dict(self.metrics)
+        metrics["pending"] = self.dirty
+        return metrics
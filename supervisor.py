@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+class TaskSupervisor:
+    """
+    Owns the bot's long-running background tasks.
+
+    Each task is registered once by name and started at most once, no matter
+    how often start() is called (discord.py fires on_ready again after a
+    reconnect). A task that crashes is restarted with exponential backoff, and
+    shutdown() cancels everything cleanly.
+    """
+
+    def __init__(self, on_error: Optional[Callable[[str], Awaitable]] = None,
+                 base_backoff: float = 5, max_backoff: float = 300, stable_after: float = 600):
+        self.on_error = on_error
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after  # A task that ran this long before crashing starts over at base_backoff
+        self.factories: Dict[str, Callable[[], Awaitable]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.state: Dict[str, Dict] = {}
+
+    def register(self, name: str, factory: Callable[[], Awaitable]):
+        """Register a background task. Registering the same name again is a no-op."""
+        if name in self.factories:
+            return
+        self.factories[name] = factory
+        self.state[name] = {
+            "status": "registered",
+            "restarts": 0,
+            "last_error": None,
+            "started_at": None
+        }
+
+    def start(self):
+        """Start every registered task that is not already running."""
+        for name in self.factories:
+            task = self.tasks.get(name)
+            if task is None or task.done():
+                self.tasks[name] = asyncio.create_task(self._supervise(name), name=f"supervised:{name}")
+
+    async def _supervise(self, name: str):
+        state = self.state[name]
+        failures = 0
+        while True:
+            state["status"] = "running"
+            state["started_at"] = time.time()
+            started = time.monotonic()
+            try:
+                await self.factories[name]()
+                state["status"] = "finished"
+                logging.info(f"Background task {name} finished")
+                return
+            except asyncio.CancelledError:
+                state["status"] = "cancelled"
+                raise
+            except Exception as e:
+                if time.monotonic() - started >= self.stable_after:
+                    failures = 0
+                failures += 1
+                delay = min(self.base_backoff * 2 ** (failures - 1), self.max_backoff)
+                state["status"] = "restarting"
+                state["restarts"] += 1
+                state["last_error"] = str(e)
+                error_msg = f"Background task {name} crashed: {e} - restarting in {delay:.0f}s"
+                logging.error(error_msg, exc_info=True)
+                if self.on_error:
+                    try:
+                        await self.on_error(error_msg)
+                    except Exception as report_error:
+                        logging.error(f"Failed to report task crash: {report_error}")
+                await asyncio.sleep(delay)
+
+    async def shutdown(self):
+        """Cancel every task and wait for them to stop."""
+        tasks = [task for task in self.tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    def status(self) -> List[Dict]:
+        """Status of every registered task."""
+        return [dict(self.state[name], name=name) for name in self.factories]
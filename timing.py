@@ -0,0 +1,87 @@
+import functools
+import inspect
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+class Histogram:
+    """Running count/sum/max of a timing, plus a window of recent samples for percentiles."""
+
+    def __init__(self, window: int = 500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile (0-100) of the recent samples, nearest-rank."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+class Timings:
+    """
+    In-memory timing histograms for the stages of the stock, weather and
+    health-check pipelines. Stages are named "<pipeline>.<stage>", e.g.
+    "scrape.goto" or "stock.send".
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.histograms: Dict[str, Histogram] = {}
+
+    def observe(self, name: str, seconds: float):
+        """Record one measurement for a stage."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.window)
+        histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block (sync or containing awaits) as one sample of `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def timed(self, name: str):
+        """Decorator that times every call of a function (sync or async) as `name`."""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self, prefix: str = "") -> List[Dict]:
+        """p50/p95/max and count for every stage, sorted by name."""
+        return [{
+            "name": name,
+            "count": histogram.count,
+            "p50": histogram.percentile(50),
+            "p95": histogram.percentile(95),
+            "max": histogram.max
+        } for name, histogram in sorted(self.histograms.items()) if name.startswith(prefix)]
+
+# Global instance
+timings = Timings()
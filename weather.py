@@ -0,0 +1,127 @@
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import aiohttp
+from timing import timings
+
+STOCK_URL = "https://growagardenvalues.com/stock/stocks.php"
+
+class WeatherProbe:
+    """
+    Reads only the current weather, without the full browser scrape.
+
+    The stock page is fetched with a plain HTTP request (conditional on the
+    last ETag/Last-Modified, so an unchanged page costs a 304) and only the
+    weather section is parsed. Results are cached for `ttl` seconds, and
+    check() reports whether the weather changed since the previous check.
+    """
+
+    def __init__(self, url: str = STOCK_URL, ttl: float = 10, timeout: float = 10,
+                 clock: Callable[[], float] = time.monotonic):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.clock = clock
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.etag = None
+        self.last_modified = None
+        self.current: Optional[List[str]] = None  # Weather lines, most recent first
+        self.fetched_at = None
+        self.last_checked: Optional[List[str]] = None
+        self.metrics = {
+            "requests": 0,
+            "cache_hits": 0,
+            "not_modified": 0,
+            "changes": 0,
+            "failures": 0
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def _download(self) -> Optional[str]:
+        """Fetch the stock page. Returns None if it has not changed since the last fetch."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with self._get_session().get(self.url, headers=headers, timeout=timeout) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            return await response.text()
+
+    @staticmethod
+    def parse(html: str) -> List[str]:
+        """Pull the weather lines out of the stock page, in the same format as the scraper."""
+        from bs4 import BeautifulSoup, SoupStrainer  # Imported on first use to keep startup fast
+        section = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(id="weather-section"))
+        if not section.find(id="weather-section"):
+            raise ValueError("Stock page has no weather section")
+
+        weather = []
+        for item in section.find_all('div', class_='stock-item'):
+            name_elem = item.find('div', class_='item-name')
+            if not name_elem:
+                continue
+            name = name_elem.text.strip()
+            time_elem = item.find('div', class_='item-quantity')
+            weather.append(f"{name} - {time_elem.text.strip()}" if time_elem else name)
+        return weather
+
+    async def get(self, max_age: Optional[float] = None) -> Optional[List[str]]:
+        """
+        Current weather lines, from cache if they are younger than max_age (default: ttl).
+        Returns None if the weather could not be read.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        now = self.clock()
+        if self.current is not None and self.fetched_at is not None and now - self.fetched_at < max_age:
+            self.metrics["cache_hits"] += 1
+            return self.current
+
+        self.metrics["requests"] += 1
+        try:
+            with timings.span("weather.probe"):
+                html = await self._download()
+            if html is None:
+                self.metrics["not_modified"] += 1
+            else:
+                with timings.span("weather.parse"):
+                    self.current = self.parse(html)
+            self.fetched_at = self.clock()
+            return self.current
+        except Exception as e:
+            self.metrics["failures"] += 1
+            logging.warning(f"Weather probe failed: {e}")
+            return None
+
+    async def check(self) -> Tuple[Optional[List[str]], bool]:
+        """Get the current weather and whether the latest entry changed since the last check."""
+        weather = await self.get()
+        if weather is None:
+            return None, False
+        latest = weather[:1]
+        changed = self.last_checked is not None and latest != self.last_checked
+        if changed:
+            self.metrics["changes"] += 1
+        self.last_checked = latest
+        return weather, changed
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return a copy of the probe counters."""
+        return dict(self.metrics)
+
+# Global instance
+weather_probe = WeatherProbe()
@@ -0,0 +1,124 @@
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+import discord
+
+class WebhookDelivery:
+    """
+    Posts messages through per-channel webhooks instead of the bot's own sends.
+
+    Webhook sends have their own rate limits, so heavy stock traffic no longer
+    delays command responses and role edits. Webhooks are created on demand and
+    share one pooled HTTP session. Only their IDs are persisted (`webhooks`,
+    channel ID -> {"id"}, saved by the bot through `on_change`): a token lets
+    anyone post as the bot, so tokens are kept in memory and read again from
+    channel.webhooks() after a restart. If a webhook is missing or cannot be
+    used, the message falls back to a normal channel send; errors that leave
+    it unclear whether the webhook post went through are raised instead, so a
+    message is never sent twice.
+    """
+
+    def __init__(self, webhooks: Dict[str, Dict], name: str = "Grow A Garden Stock Bot",
+                 on_change: Optional[Callable[[], Awaitable]] = None):
+        self.webhooks = webhooks
+        for cached in webhooks.values():
+            cached.pop("token", None)  # Older caches stored the token; it is dropped on the next save
+        self.name = name
+        self.on_change = on_change  # Writes `webhooks` to disk
+        self.tokens: Dict[int, str] = {}  # webhook ID -> token, never written to disk
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.unavailable = set()  # Channels where we lack permission to manage webhooks
+        self.failovers = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=20))
+        return self.session
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def get_webhook(self, channel, create: bool = True) -> Optional[discord.Webhook]:
+        """
+        Return the channel's webhook, looking it up (or creating one, if `create`) when
+        its token is not known yet. Without `create` only the webhook recorded for the
+        channel is returned, since messages can only be edited by the webhook that sent them.
+        """
+        cached = self.webhooks.get(str(channel.id))
+        if cached and cached["id"] in self.tokens:
+            return discord.Webhook.partial(cached["id"], self.tokens[cached["id"]], session=self._get_session())
+        if not cached and not create:
+            return None
+
+        bot_user = channel.guild.me
+        webhook = None
+        for existing in await channel.webhooks():
+            if existing.user and existing.user.id == bot_user.id and existing.token:
+                if cached and existing.id == cached["id"]:
+                    webhook = existing
+                    break
+                if create and webhook is None:
+                    webhook = existing
+        if webhook is None and not create:
+            return None
+
+        if webhook is None:
+            avatar = None
+            try:
+                avatar = await bot_user.display_avatar.read()
+            except Exception as e:
+                logging.warning(f"Could not read bot avatar for webhook: {e}")
+            webhook = await channel.create_webhook(name=self.name, avatar=avatar, reason="Stock post delivery")
+            logging.info(f"Created delivery webhook for #{channel.name}")
+
+        self.tokens[webhook.id] = webhook.token
+        if not cached or cached["id"] != webhook.id:
+            self.webhooks[str(channel.id)] = {"id": webhook.id}
+            if self.on_change:
+                await self.on_change()  # Save right away so a crash does not orphan the new webhook
+        return discord.Webhook.partial(webhook.id, webhook.token, session=self._get_session())
+
+    def forget(self, channel_id: int):
+        """Drop a cached webhook, e.g. after it was deleted."""
+        cached = self.webhooks.pop(str(channel_id), None)
+        if cached:
+            self.tokens.pop(cached["id"], None)
+
+    async def send(self, channel, **kwargs) -> discord.Message:
+        """Send through the channel webhook, falling back to channel.send."""
+        if channel.id not in self.unavailable:
+            for attempt in range(2):
+                try:
+                    webhook = await self.get_webhook(channel)
+                    return await webhook.send(wait=True, **kwargs)
+                except discord.NotFound:
+                    # The webhook was deleted - recreate it once before giving up
+                    logging.warning(f"Delivery webhook for #{channel.name} is gone, recreating it")
+                    self.forget(channel.id)
+                except discord.Forbidden:
+                    logging.warning(f"Missing 'Manage Webhooks' in #{channel.name} - using normal sends there")
+                    self.unavailable.add(channel.id)
+                    break
+                except discord.HTTPException as e:
+                    # A 4xx means Discord rejected the post, so it is safe to send it another way.
+                    # Anything else (5xx, timeouts, dropped connections) may have been delivered
+                    # already, and sending it again could post the message twice.
+                    if not 400 <= e.status < 500:
+                        raise
+                    logging.warning(f"Webhook delivery to #{channel.name} failed: {e}")
+                    break
+        self.failovers += 1
+        return await channel.send(**kwargs)
+
+    async def edit(self, channel, message_id: int, **kwargs) -> Optional[discord.WebhookMessage]:
+        """
+        Edit a message previously sent through the channel webhook.
+        Returns None if the channel has no cached webhook to edit with.
+        """
+        webhook = await self.get_webhook(channel, create=False)
+        if webhook is None:
+            return None
+        return await webhook.edit_message(message_id, **kwargs)
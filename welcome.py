@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List
+
+class WelcomeBatcher:
+    """
+    Welcomes new members one by one while joins are normal, and in batches
+    during a burst (a raid or a big invite push).
+
+    When `threshold` members join within `window` seconds the batcher
+    switches to burst mode: joins are queued and every `interval` seconds one
+    message greets up to `batch_size` of them (the rest are only counted). It
+    switches back once the join rate falls below half the threshold and the
+    queue is empty.
+    """
+
+    def __init__(self, send_one: Callable[[object], Awaitable], send_batch: Callable[[List, int], Awaitable],
+                 threshold: int = 10, window: float = 60, interval: float = 30, batch_size: int = 50,
+                 clock: Callable[[], float] = time.monotonic):
+        self.send_one = send_one
+        self.send_batch = send_batch  # (members, number of extra members not listed)
+        self.threshold = threshold
+        self.window = window
+        self.interval = interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self.joins: deque = deque()  # Join times within the window
+        self.queue: List = []
+        self.burst = False
+        self.metrics = {
+            "joins": 0,
+            "single_welcomes": 0,
+            "batch_welcomes": 0,
+            "batched_members": 0,
+            "bursts": 0
+        }
+        self._wakeup = asyncio.Event()
+
+    def _prune(self, now: float):
+        while self.joins and now - self.joins[0] > self.window:
+            self.joins.popleft()
+
+    def join_rate(self) -> float:
+        """Joins per minute over the last window."""
+        self._prune(self.clock())
+        return len(self.joins) * 60 / self.window
+
+    async def submit(self, member):
+        """Welcome a new member now, or queue them while a burst is going on."""
+        now = self.clock()
+        self.joins.append(now)
+        self._prune(now)
+        self.metrics["joins"] += 1
+        if not self.burst and len(self.joins) >= self.threshold:
+            self.burst = True
+            self.metrics["bursts"] += 1
+            logging.warning(f"Join burst: {len(self.joins)} joins in the last {self.window:g}s, batching welcome messages")
+        if self.burst:
+            self.queue.append(member)
+            self._wakeup.set()
+            return
+        await self.send_one(member)
+        self.metrics["single_welcomes"] += 1
+
+    async def flush(self):
+        """Greet everyone queued so far in one message."""
+        if not self.queue:
+            return
+        members, self.queue = self.queue, []
+        listed = members[:self.batch_size]
+        try:
+            await self.send_batch(listed, len(members) - len(listed))
+            self.metrics["batch_welcomes"] += 1
+            self.metrics["batched_members"] += len(members)
+        except Exception as e:
+            logging.error(f"Failed to send batch welcome for {len(members)} members: {e}")
+
+    async def run(self):
+        """While a burst lasts, send one batch welcome per interval."""
+        while True:
+            await self._wakeup.wait()
+            while self.burst:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+                self._prune(self.clock())
+                if len(self.joins) < self.threshold / 2 and not self.queue:
+                    self.burst = False
+                    logging.info(f"Join burst over ({self.join_rate():.1f} joins/min), welcoming members individually again")
+            self._wakeup.clear()
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Return a copy of the counters plus the current join rate and mode."""
+        metrics = dict(self.metrics)
+        metrics["join_rate"] = self.join_rate()
+        metrics["burst"] = int(self.burst)
+        metrics["queued"] = len(self.queue)
+        return metrics